@@ -0,0 +1,230 @@
+from __future__ import annotations
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+import structlog
+from fastapi import HTTPException
+
+from ..config import settings
+
+log = structlog.get_logger(__name__)
+
+try:
+    import redis.asyncio as aioredis
+except Exception:  # pragma: no cover
+    aioredis = None
+
+
+class TokenBucket:
+    """
+    In-process token buckets keyed by name (one worker's view only).
+    A bucket that has refilled to `burst` is the same as no bucket, so those are swept every
+    `sweep_every_s`; keys come from request bodies and would otherwise grow without bound.
+    """
+
+    def __init__(self, sweep_every_s: float = 1.0):
+        self._buckets: dict[str, tuple[float, float, float]] = {}  # key -> (tokens, last_refill, full_at)
+        self.sweep_every_s = sweep_every_s
+        self._next_sweep = time.monotonic() + sweep_every_s
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    async def take(self, key: str, rate: float, burst: float, cost: float = 1.0) -> bool:
+        now = time.monotonic()
+        if now >= self._next_sweep:
+            self._buckets = {k: b for k, b in self._buckets.items() if b[2] > now}
+            self._next_sweep = now + self.sweep_every_s
+        tokens, ts, _ = self._buckets.get(key, (burst, now, now))
+        tokens = min(burst, tokens + (now - ts) * rate)
+        ok = tokens >= cost
+        if ok:
+            tokens -= cost
+        full_at = now + (burst - tokens) / rate if rate > 0 else math.inf
+        self._buckets[key] = (tokens, now, full_at)
+        return ok
+
+
+# Atomic refill-and-take; uses the Redis clock so every worker/host agrees on time.
+_TOKEN_BUCKET_LUA = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local b = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(b[1]) or burst
+local ts = tonumber(b[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local ok = 0
+if tokens >= cost then
+  tokens = tokens - cost
+  ok = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return ok
+"""
+
+
+class RedisTokenBucket:
+    """
+    Token buckets shared by every worker through Redis. Calls are bounded by short socket
+    timeouts; after a failure the local buckets are used for `retry_after_s` before Redis is
+    tried again, so a blackholed Redis costs one timeout per cooldown, not one per request.
+    """
+
+    def __init__(self, url: str, prefix: str = "tb:", timeout_s: Optional[float] = None, retry_after_s: float = 5.0):
+        timeout_s = settings.REDIS_SOCKET_TIMEOUT_S if timeout_s is None else timeout_s
+        self._redis = aioredis.Redis.from_url(url, socket_timeout=timeout_s, socket_connect_timeout=timeout_s)
+        self._script = self._redis.register_script(_TOKEN_BUCKET_LUA)
+        self._prefix = prefix
+        self._fallback = TokenBucket()
+        self.retry_after_s = retry_after_s
+        self._down_until = 0.0
+
+    async def take(self, key: str, rate: float, burst: float, cost: float = 1.0) -> bool:
+        if time.monotonic() >= self._down_until:
+            try:
+                return bool(await self._script(keys=[self._prefix + key], args=[rate, burst, cost]))
+            except Exception as e:
+                self._down_until = time.monotonic() + self.retry_after_s
+                log.warning("rate_limit_redis_failed", error=str(e), retry_after_s=self.retry_after_s)
+        return await self._fallback.take(key, rate, burst, cost)
+
+
+class LoopLagMonitor:
+    """
+    Measures how late the event loop wakes a sleeping task; a busy/blocked loop shows up as lag.
+    `beat` (monotonic) is the loop's heartbeat, also read by the profiling LoopWatchdog.
+    """
+
+    def __init__(self, interval_s: float = 0.05):
+        self.interval_s = interval_s
+        self.lag_ms = 0.0
+        self.beat = time.monotonic()
+
+    async def run(self) -> None:
+        while True:
+            start = time.perf_counter()
+            self.beat = time.monotonic()
+            await asyncio.sleep(self.interval_s)
+            lag = (time.perf_counter() - start - self.interval_s) * 1000
+            # decay slowly, react immediately to spikes
+            self.lag_ms = max(lag, self.lag_ms * 0.8)
+
+
+def _overloaded(detail: str) -> HTTPException:
+    return HTTPException(status_code=503, detail=detail, headers={"Retry-After": "1"})
+
+
+class AdmissionController:
+    """
+    Admission in front of Router.route_and_answer:
+    1. shed early (503) when event-loop lag or the wait queue is over its bound,
+    2. per-user and global token buckets (429) — Redis-backed when REDIS_URL is set,
+    3. per-user concurrency cap (429),
+    4. global concurrency limit with a bounded wait queue and a deadline (503 on expiry).
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 64,
+        max_per_user: int = 4,
+        queue_size: int = 128,
+        queue_timeout_s: float = 2.0,
+        max_loop_lag_ms: float = 200.0,
+        user_rate: float = 2.0,
+        user_burst: float = 10.0,
+        global_rate: float = 200.0,
+        global_burst: float = 400.0,
+        buckets: Optional[TokenBucket | RedisTokenBucket] = None,
+        lag_monitor: Optional[LoopLagMonitor] = None,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_per_user = max_per_user
+        self.queue_size = queue_size
+        self.queue_timeout_s = queue_timeout_s
+        self.max_loop_lag_ms = max_loop_lag_ms
+        self.user_rate, self.user_burst = user_rate, user_burst
+        self.global_rate, self.global_burst = global_rate, global_burst
+        self.buckets = buckets or TokenBucket()
+        self.lag_monitor = lag_monitor or LoopLagMonitor()
+        self._sem = asyncio.Semaphore(max_concurrency)
+        self._active_by_user: dict[str, int] = {}
+        self.waiting = 0
+        self.active = 0
+        self.stats = {"admitted": 0, "shed_lag": 0, "shed_queue": 0, "shed_deadline": 0, "rate_limited": 0}
+
+    @asynccontextmanager
+    async def admit(self, user_id: str) -> AsyncIterator[None]:
+        if self.lag_monitor.lag_ms > self.max_loop_lag_ms:
+            self.stats["shed_lag"] += 1
+            raise _overloaded("Server overloaded (event loop lag)")
+        if self.active >= self.max_concurrency and self.waiting >= self.queue_size:
+            self.stats["shed_queue"] += 1
+            raise _overloaded("Server overloaded (queue full)")
+
+        if not await self.buckets.take(f"user:{user_id}", self.user_rate, self.user_burst) or not await self.buckets.take(
+            "global", self.global_rate, self.global_burst
+        ):
+            self.stats["rate_limited"] += 1
+            raise HTTPException(status_code=429, detail="Rate limit exceeded", headers={"Retry-After": "1"})
+
+        if self._active_by_user.get(user_id, 0) >= self.max_per_user:
+            self.stats["rate_limited"] += 1
+            raise HTTPException(status_code=429, detail="Too many concurrent requests for this user")
+
+        self._active_by_user[user_id] = self._active_by_user.get(user_id, 0) + 1
+        try:
+            self.waiting += 1
+            try:
+                if self._sem.locked():
+                    await asyncio.wait_for(self._sem.acquire(), timeout=self.queue_timeout_s)
+                else:
+                    await self._sem.acquire()  # free slot: skip wait_for's extra task
+            except asyncio.TimeoutError:
+                self.stats["shed_deadline"] += 1
+                raise _overloaded("Server overloaded (queue deadline exceeded)")
+            finally:
+                self.waiting -= 1
+            self.active += 1
+            self.stats["admitted"] += 1
+            try:
+                yield
+            finally:
+                self.active -= 1
+                self._sem.release()
+        finally:
+            left = self._active_by_user.get(user_id, 1) - 1
+            if left:
+                self._active_by_user[user_id] = left
+            else:
+                self._active_by_user.pop(user_id, None)
+
+    def snapshot(self) -> dict:
+        return {
+            **self.stats,
+            "active": self.active,
+            "waiting": self.waiting,
+            "loop_lag_ms": round(self.lag_monitor.lag_ms, 1),
+        }
+
+
+def admission_from_settings() -> AdmissionController:
+    buckets = RedisTokenBucket(settings.REDIS_URL) if settings.REDIS_URL and aioredis else TokenBucket()
+    return AdmissionController(
+        max_concurrency=settings.ADMISSION_MAX_CONCURRENCY,
+        max_per_user=settings.ADMISSION_MAX_PER_USER,
+        queue_size=settings.ADMISSION_QUEUE_SIZE,
+        queue_timeout_s=settings.ADMISSION_QUEUE_TIMEOUT_S,
+        max_loop_lag_ms=settings.ADMISSION_MAX_LOOP_LAG_MS,
+        user_rate=settings.RATE_LIMIT_USER_RPS,
+        user_burst=settings.RATE_LIMIT_USER_BURST,
+        global_rate=settings.RATE_LIMIT_GLOBAL_RPS,
+        global_burst=settings.RATE_LIMIT_GLOBAL_BURST,
+        buckets=buckets,
+    )
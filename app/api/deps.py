@@ -1,28 +1,61 @@
 from __future__ import annotations
-from ..tools import ToolRegistry, WeatherTool, StocksTool
-from ..core.memory import MemoryStore
+from ..config import settings
+from ..tools import ToolRegistry, WeatherTool, StocksTool, ToolRefresher
+from ..core.memory import MemoryStore, AsyncMemoryStore, make_memory_store
 from ..core.context import ContextManager
 from ..core.router import Router
+from ..core.summary import ConversationSummarizer
+from ..core.profiling import RequestProfiler, LoopWatchdog
+from .admission import AdmissionController, admission_from_settings
 
 # Singletons for the process (tests can override these via FastAPI dependency_overrides)
+_refresher = ToolRefresher(
+    top_n=settings.TOOL_PREFETCH_TOP_N, interval_s=settings.TOOL_PREFETCH_INTERVAL_S
+)
 _registry = ToolRegistry()
-_registry.register(WeatherTool())
-_registry.register(StocksTool())
+_registry.register(_refresher.wrap(WeatherTool()))
+_registry.register(_refresher.wrap(StocksTool()))
 
-_mem = MemoryStore()            # now writes to ./var/data/memory.db by default
+_mem = make_memory_store()      # async engine on MEMORY_DB_URL unless MEMORY_BACKEND=sync
 _ctx = ContextManager(_mem)
+_summarizer = ConversationSummarizer(_mem, max_chars=settings.SUMMARY_MAX_CHARS)
 
 # Your Router currently expects (registry, mem, ctx)
 _router = Router(_registry, _mem, _ctx)
 
+_admission = admission_from_settings()
+
+_profiler = RequestProfiler(
+    interval_s=settings.PROFILE_SAMPLE_INTERVAL_MS / 1000, max_requests=settings.PROFILE_MAX_REQUESTS
+)
+# shares the admission lag monitor's heartbeat instead of running its own timer on the loop
+_watchdog = LoopWatchdog(
+    lambda: _admission.lag_monitor.beat, threshold_s=settings.LOOP_BLOCK_THRESHOLD_MS / 1000 or 0.5
+)
+
 def get_registry() -> ToolRegistry:
     return _registry
 
-def get_memory() -> MemoryStore:
+def get_refresher() -> ToolRefresher:
+    return _refresher
+
+def get_memory() -> MemoryStore | AsyncMemoryStore:
     return _mem
 
 def get_context() -> ContextManager:
     return _ctx
 
+def get_summarizer() -> ConversationSummarizer:
+    return _summarizer
+
 def get_router() -> Router:
     return _router
+
+def get_admission() -> AdmissionController:
+    return _admission
+
+def get_profiler() -> RequestProfiler:
+    return _profiler
+
+def get_watchdog() -> LoopWatchdog:
+    return _watchdog
@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from ...security import enforce_admin_auth
+from ..deps import get_profiler, get_watchdog
+router = APIRouter(prefix="/admin", dependencies=[Depends(enforce_admin_auth)])
+
+@router.post("/profile")
+def arm_profile(
+    requests: int = Query(20, ge=1),
+    interval_ms: float | None = Query(None, gt=0),
+    profiler = Depends(get_profiler),
+):
+    # sample every thread's stack while the next `requests` /chat calls complete
+    return profiler.arm(requests, interval_ms / 1000 if interval_ms else None)
+
+@router.get("/profile")
+def profile_status(profiler = Depends(get_profiler), watchdog = Depends(get_watchdog)):
+    return {**profiler.status(), "loop_watchdog": watchdog.snapshot()}
+
+@router.get("/profile/folded", response_class=PlainTextResponse)
+def profile_folded(profiler = Depends(get_profiler)):
+    # folded stacks: pipe into flamegraph.pl / inferno-flamegraph, or load in speedscope
+    if not profiler.last:
+        raise HTTPException(status_code=404, detail="No completed capture yet")
+    return profiler.last["folded"]
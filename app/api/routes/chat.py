@@ -1,8 +1,10 @@
 from fastapi import APIRouter, Depends, Request  # <-- add Request
 from ...models.schemas import ChatRequest, ChatResponse
 from ...security import enforce_bearer_auth
+from ...core.memory import call_store
 from ..limits import limiter
-from ..deps import get_router, get_memory, get_context
+from ...config import settings
+from ..deps import get_router, get_memory, get_context, get_admission, get_summarizer
 
 router = APIRouter()
 
@@ -14,20 +16,28 @@ async def chat(
     core_router = Depends(get_router),
     mem = Depends(get_memory),
     ctx = Depends(get_context),
+    admission = Depends(get_admission),
+    summarizer = Depends(get_summarizer),
     _ = Depends(enforce_bearer_auth),
 ):
-    # index the user message for semantic recall
-    ctx.index_message(req.user_id, "user", req.message)
+    # concurrency/queue/rate admission; sheds with 429/503 before any work instead of queueing
+    async with admission.admit(req.user_id):
+        # index the user message for semantic recall
+        ctx.index_message(req.user_id, "user", req.message)
 
-    # route & answer (hybrid router signature expects user_id + text)
-    answer, used_tool, tool_latency, model_latency = await core_router.route_and_answer(
-        req.user_id, req.message
-    )
+        # route & answer (hybrid router signature expects user_id + text)
+        answer, used_tool, tool_latency, model_latency = await core_router.route_and_answer(
+            req.user_id, req.message
+        )
+
+        # persist transcript + index assistant reply
+        await call_store(mem.add, req.user_id, "user", req.message)
+        await call_store(mem.add, req.user_id, "assistant", answer)
+        ctx.index_message(req.user_id, "assistant", answer)
 
-    # persist transcript + index assistant reply
-    mem.add(req.user_id, "user", req.message)
-    mem.add(req.user_id, "assistant", answer)
-    ctx.index_message(req.user_id, "assistant", answer)
+    # fold this turn into the rolling summary after we respond (off the request path)
+    if settings.SUMMARY_ENABLED:
+        summarizer.schedule(req.user_id, req.message, answer)
 
     return ChatResponse(
         answer=answer,
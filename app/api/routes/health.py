@@ -1,7 +1,19 @@
 from fastapi import APIRouter, Request
 from ...config import settings
+from ...core.upstream import upstream_metrics
+from ..deps import get_admission
 router = APIRouter()
 
 @router.get("/health")
 def health(request: Request):
-    return {"status":"ok","model":settings.OPENAI_MODEL}
\ No newline at end of file
+    return {"status":"ok","model":settings.OPENAI_MODEL}
+
+@router.get("/health/upstreams")
+def upstreams(request: Request):
+    # per-upstream latency percentiles, adaptive timeout, breaker state, hedges fired/won
+    return upstream_metrics()
+
+@router.get("/health/admission")
+def admission(request: Request):
+    # active/waiting requests, shed and rate-limited counts, current event-loop lag
+    return get_admission().snapshot()
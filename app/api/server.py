@@ -1,3 +1,6 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse, RedirectResponse
@@ -7,19 +10,51 @@ from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
 from .limits import limiter
 
+from ..config import settings
 from ..logging_conf import configure_logging
-from ..tools import ToolRegistry, WeatherTool, StocksTool
-from ..core.router import Router
-from ..core.memory import MemoryStore
-from ..core.context import ContextManager
+from ..core.memory import MemoryStore, AsyncMemoryStore
+from ..core.maintenance import compactor_from_settings
+from .deps import (
+    get_registry, get_memory, get_context, get_router, get_refresher, get_admission, get_summarizer,
+    get_profiler, get_watchdog,
+)
 
 from .routes.chat import router as chat_router
 from .routes.health import router as health_router
+from .routes.admin import router as admin_router
 
 configure_logging()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # background jobs live for the lifetime of the worker
+    tasks: list[asyncio.Task] = [
+        asyncio.create_task(get_refresher().run_forever()),
+        asyncio.create_task(get_admission().lag_monitor.run()),
+    ]
+    if settings.LOOP_BLOCK_THRESHOLD_MS > 0:
+        get_watchdog().start()
+    mem = get_memory()
+    if settings.MEMORY_COMPACT_INTERVAL_S > 0 and settings.MEMORY_DB_URL.startswith("sqlite"):
+        # compaction is SQLite-specific and runs in a thread, so it always gets a sync store
+        sync_mem = mem if isinstance(mem, MemoryStore) else MemoryStore(settings.MEMORY_DB_URL)
+        compactor = compactor_from_settings(sync_mem)
+        tasks.append(asyncio.create_task(compactor.run_forever(settings.MEMORY_COMPACT_INTERVAL_S)))
+    try:
+        yield
+    finally:
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        get_watchdog().stop()
+        await get_summarizer().aclose()
+        if isinstance(mem, AsyncMemoryStore):
+            await mem.close()
+
+
 def create_app() -> FastAPI:
-    app = FastAPI(title="AI Q&A Assistant", version="0.1.0")
+    app = FastAPI(title="AI Q&A Assistant", version="0.1.0", lifespan=lifespan)
 
     # rate limiting
     app.state.limiter = limiter
@@ -30,6 +65,20 @@ def create_app() -> FastAPI:
 
     app.add_middleware(SlowAPIMiddleware)
 
+    if settings.PROFILING_ENABLED:
+        profiler = get_profiler()
+
+        # only installed when opted in; counts /chat requests towards an armed capture
+        @app.middleware("http")
+        async def _profile_requests(request: Request, call_next):
+            if not profiler.armed or not request.url.path.startswith("/api/v1/chat"):
+                return await call_next(request)
+            profiler.request_started()
+            try:
+                return await call_next(request)
+            finally:
+                profiler.request_finished()
+
     # CORS (relax for local dev — restrict in prod)
     app.add_middleware(
         CORSMiddleware,
@@ -39,24 +88,18 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
 
-    # --- Singletons (registry, memory, context, router) ---
-    registry = ToolRegistry()
-    registry.register(WeatherTool())
-    registry.register(StocksTool())
-
-    mem = MemoryStore()          # writes to ./var/data/memory.db
-    ctx = ContextManager(mem)
-    router = Router(registry, mem, ctx)
-
+    # --- Singletons (registry, memory, context, router) live in deps.py ---
     # expose to routes if you need app.state access later
-    app.state.registry = registry
-    app.state.mem = mem
-    app.state.ctx = ctx
-    app.state.router = router
+    app.state.registry = get_registry()
+    app.state.mem = get_memory()
+    app.state.ctx = get_context()
+    app.state.router = get_router()
 
     # --- Versioned API routes ---
     app.include_router(health_router, prefix="/api/v1")
     app.include_router(chat_router, prefix="/api/v1")
+    if settings.PROFILING_ENABLED:
+        app.include_router(admin_router, prefix="/api/v1")
 
     # --- Static UI ---
     app.mount("/ui", StaticFiles(directory="web", html=True), name="ui")
@@ -3,8 +3,11 @@ import typer
 from typing import List
 from app.tools import ToolRegistry, WeatherTool, StocksTool
 from app.core.router import Router
-from app.core.memory import MemoryStore
+from app.core.memory import AsyncMemoryStore, MemoryStore, make_memory_store
 from app.core.context import ContextManager
+from app.core.maintenance import compactor_from_settings
+from app.config import settings
+from app.core.replay import ReplayConfig, iter_turns, replay as run_replay
 
 cli = typer.Typer(help="CLI for the AI Q&A assistant")
 
@@ -28,7 +31,7 @@ def chat(
     registry = ToolRegistry()
     registry.register(WeatherTool())
     registry.register(StocksTool())
-    mem = MemoryStore()
+    mem = make_memory_store()  # same store as the API (MEMORY_BACKEND / MEMORY_DB_URL)
     ctx = ContextManager(mem)
     router = Router(registry, mem, ctx)
 
@@ -36,13 +39,6 @@ def chat(
         ans, tool, *_ = await router.route_and_answer(user, text)
         print(f"Bot> {ans} {'(via ' + tool + ')' if tool else ''}")
 
-    if message:
-        text = " ".join(message).strip()
-        if not text:
-            raise typer.Exit(code=1)
-        asyncio.run(ask_once(text))
-        return
-
     async def loop():
         while True:
             try:
@@ -53,7 +49,88 @@ def chat(
                 continue
             await ask_once(msg)
 
-    asyncio.run(loop())
+    async def session(text: str | None):
+        try:
+            await (ask_once(text) if text else loop())
+        finally:
+            if isinstance(mem, AsyncMemoryStore):
+                await mem.close()  # the async pool belongs to this event loop
+
+    text = None
+    if message:
+        text = " ".join(message).strip()
+        if not text:
+            raise typer.Exit(code=1)
+    asyncio.run(session(text))
+
+@cli.command()
+def compact():
+    """
+    Run one retention/compaction pass over memory.db and print the report.
+    The first run on a database not yet in incremental auto_vacuum mode converts it with a
+    full VACUUM (the server's background job skips such databases); run it off-peak.
+
+    Example:
+      python -m app.cli compact
+    """
+    compactor = compactor_from_settings(MemoryStore(settings.MEMORY_DB_URL))
+    with compactor.exclusive() as owner:
+        if not owner:
+            print("another process is compacting this database; try again later")
+            raise typer.Exit(code=1)
+        report = compactor.run_once()
+    print(f"kv rows removed:     {report.kv_rows_removed}")
+    print(f"messages archived:   {report.messages_archived}" + (f" -> {report.archive_path}" if report.archive_path else ""))
+    print(f"summaries removed:   {report.summaries_removed}")
+    print(f"reclaimed bytes:     {report.reclaimed_bytes} ({report.bytes_before} -> {report.bytes_after})")
+    print(f"kv lookup ms (avg):  {report.kv_lookup_ms_before:.3f} -> {report.kv_lookup_ms_after:.3f}")
+
+@cli.command()
+def replay(
+    source: str = typer.Argument(..., help="SQLite memory.db path / sqlite:/// URL, or .ndjson[.gz] export"),
+    model_a: str = typer.Option(None, help="Router model for config A (default OPENAI_MODEL)"),
+    model_b: str = typer.Option(None, help="Router model for config B"),
+    prompt_a: str = typer.Option(None, help="File with the router system prompt for A"),
+    prompt_b: str = typer.Option(None, help="File with the router system prompt for B"),
+    recorded_a: str = typer.Option(None, help="Replay A from a recording instead of calling the LLM"),
+    recorded_b: str = typer.Option(None, help="Replay B from a recording instead of calling the LLM"),
+    record_a: str = typer.Option(None, help="Write A's live router responses to this NDJSON"),
+    record_b: str = typer.Option(None, help="Write B's live router responses to this NDJSON"),
+    concurrency: int = typer.Option(16, help="Turns in flight"),
+    limit: int = typer.Option(None, help="Stop after N user turns"),
+    out: str = typer.Option("replay_diff.ndjson", help="Per-turn diffs (changed routes / errors)"),
+    live_tools: bool = typer.Option(False, help="Call real tools instead of stubs"),
+    live_answers: bool = typer.Option(False, help="Call the answer LLM instead of a stub"),
+):
+    """
+    Replay recorded user turns through two router configurations and diff routing + latencies.
+
+    Examples:
+      python -m app.cli replay memory.db --model-b gpt-4o --limit 1000
+      python -m app.cli replay var/archive/messages-20260101T000000Z.ndjson.gz --prompt-b new_router.txt
+    """
+
+    def read(path):
+        if not path:
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    a = ReplayConfig("a", model=model_a, router_prompt=read(prompt_a), recording=recorded_a, record_to=record_a)
+    b = ReplayConfig("b", model=model_b, router_prompt=read(prompt_b), recording=recorded_b, record_to=record_b)
+    with open(out, "w", encoding="utf-8") as f:
+        summary = asyncio.run(run_replay(
+            iter_turns(source, limit), a, b, concurrency=concurrency, out=f,
+            live_tools=live_tools, live_answers=live_answers,
+        ))
+    print(f"turns: {summary.turns}  changed: {summary.changed}  agreement: {summary.agreement:.3f}")
+    for transition, n in sorted(summary.transitions.items(), key=lambda kv: -kv[1]):
+        print(f"  {transition}: {n}")
+    print(f"errors: {summary.errors}")
+    for cfg, stages in summary.latency_ms.items():
+        for stage, st in stages.items():
+            print(f"  [{cfg}] {stage:<11} " + " ".join(f"{k}={v}" for k, v in st.items()))
+    print(f"diffs -> {out}")
 
 if __name__ == "__main__":
     cli()
@@ -9,9 +9,78 @@ class Settings(BaseSettings):
     ALPHA_VANTAGE_API_KEY: str | None = None
     STOCKS_PROVIDER: str = "yfinance"  # or "alphavantage"
     REDIS_URL: str | None = None
+    REDIS_SOCKET_TIMEOUT_S: float = 0.25  # connect/read timeout for Redis calls on the request path
+    # cache_get/cache_set backend: "auto" (redis if REDIS_URL else in-process), "local", "redis", "shm"
+    CACHE_BACKEND: str = "auto"
+    SHM_CACHE_PATH: str = "/dev/shm/qa-assistant-cache"
+    SHM_CACHE_SLOTS: int = 65536
+    SHM_CACHE_SLOT_BYTES: int = 1024
     API_AUTH_TOKEN: str | None = None
     LOG_LEVEL: str = "INFO"
 
+    # admission control for /chat (app/api/admission.py); buckets are shared via REDIS_URL when set
+    ADMISSION_MAX_CONCURRENCY: int = 64
+    ADMISSION_MAX_PER_USER: int = 4
+    ADMISSION_QUEUE_SIZE: int = 128
+    ADMISSION_QUEUE_TIMEOUT_S: float = 2.0
+    ADMISSION_MAX_LOOP_LAG_MS: float = 200.0
+    RATE_LIMIT_USER_RPS: float = 2.0
+    RATE_LIMIT_USER_BURST: float = 10.0
+    RATE_LIMIT_GLOBAL_RPS: float = 200.0
+    RATE_LIMIT_GLOBAL_BURST: float = 400.0
+
+    # upstream call policy (app/core/upstream.py): adaptive timeouts, hedging, circuit breakers
+    UPSTREAM_MIN_TIMEOUT_S: float = 0.5
+    UPSTREAM_MAX_TIMEOUT_S: float = 10.0
+    UPSTREAM_TIMEOUT_MULTIPLIER: float = 3.0
+    UPSTREAM_HEDGING: bool = True
+    UPSTREAM_HEDGE_QUANTILE: float = 0.95
+    UPSTREAM_BREAKER_FAILURES: int = 5
+    UPSTREAM_BREAKER_RESET_S: float = 30.0
+    OPENAI_MAX_TIMEOUT_S: float = 30.0
+
+    # tool result caching: serve fresh for *_CACHE_TTL_S, then stale (revalidating) for *_MAX_STALE_S
+    WEATHER_CACHE_TTL_S: int = 300
+    WEATHER_MAX_STALE_S: int = 600
+    # coalesce concurrent forecast lookups into one multi-location request (0 disables)
+    WEATHER_BATCH_WINDOW_MS: float = 10.0
+    WEATHER_BATCH_MAX: int = 50
+    STOCKS_CACHE_TTL_S: int = 30
+    STOCKS_MAX_STALE_S: int = 60
+    TOOL_PREFETCH_TOP_N: int = 20
+    TOOL_PREFETCH_INTERVAL_S: float = 5.0
+
+    # per-user hybrid retrieval over prior turns (app/core/retrieval.py)
+    RETRIEVAL_ANN_THRESHOLD: int = 50_000
+    RETRIEVAL_EF_SEARCH: int = 512  # HNSW search breadth: recall vs latency (see bench/retrieval.py)
+    RETRIEVAL_VECTOR_WEIGHT: float = 0.5
+    RETRIEVAL_RECENCY_HALF_LIFE: float | None = 50.0  # in turns
+
+    # rolling per-user conversation summary injected into LLM-only prompts
+    SUMMARY_ENABLED: bool = True
+    SUMMARY_MAX_CHARS: int = 1200
+
+    # transcript/KV store: "async" (aiosqlite, or asyncpg for postgresql:// URLs) or "sync"
+    MEMORY_BACKEND: str = "async"
+    MEMORY_DB_URL: str = "sqlite:///./memory.db"
+    MEMORY_POOL_SIZE: int = 10
+    MEMORY_MAX_OVERFLOW: int = 10
+    MEMORY_POOL_TIMEOUT_S: float = 5.0
+
+    # memory.db retention / compaction (interval 0 disables the background job)
+    MEMORY_COMPACT_INTERVAL_S: int = 3600
+    MESSAGES_RETENTION_DAYS: int | None = 90
+    MESSAGES_RETENTION_DAYS_BY_USER: dict[str, int] = {}
+    MESSAGES_MAX_PER_USER: int | None = 5000
+    MEMORY_ARCHIVE_DIR: str = "./var/archive"
+
+    # opt-in profiling: /api/v1/admin/profile arms a stack sampler for the next N /chat requests
+    PROFILING_ENABLED: bool = False
+    PROFILE_SAMPLE_INTERVAL_MS: float = 5.0
+    PROFILE_MAX_REQUESTS: int = 500
+    # log the event loop's stack when it is blocked this long (0 disables the watchdog)
+    LOOP_BLOCK_THRESHOLD_MS: float = 500.0
+
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
 
 
@@ -0,0 +1,78 @@
+# app/core/batching.py
+from __future__ import annotations
+import asyncio
+from typing import Awaitable, Callable, Generic, Hashable, Optional, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class MicroBatcher(Generic[K, V]):
+    """Coalesce lookups arriving within `window_s` into one `fetch(keys)` call.
+
+    `fetch` must return one result per key, in order. A batch is sent when the
+    window closes or `max_batch` distinct keys are pending, whichever is first.
+    Identical keys in the same window share a result. A failed batch fails
+    every caller in it. `window_s <= 0` or `max_batch <= 1` disables batching.
+    """
+
+    def __init__(self, fetch: Callable[[list[K]], Awaitable[list[V]]], window_s: float = 0.01, max_batch: int = 50):
+        self.fetch = fetch
+        self.window_s = window_s
+        self.max_batch = max_batch
+        self._pending: dict[K, asyncio.Future] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._inflight: set[asyncio.Task] = set()
+        self.stats = {"requests": 0, "batches": 0, "keys": 0, "max_batch": 0}
+
+    async def submit(self, key: K) -> V:
+        self.stats["requests"] += 1
+        if self.window_s <= 0 or self.max_batch <= 1:
+            self._count([key])
+            return (await self.fetch([key]))[0]
+
+        fut = self._pending.get(key)
+        if fut is None:
+            fut = asyncio.get_running_loop().create_future()
+            self._pending[key] = fut
+            if len(self._pending) >= self.max_batch:
+                self._flush()
+            elif self._timer is None:
+                self._timer = asyncio.get_running_loop().call_later(self.window_s, self._flush)
+        # shield: one caller giving up must not cancel the result for the others
+        return await asyncio.shield(fut)
+
+    def _count(self, keys: list[K]) -> None:
+        self.stats["batches"] += 1
+        self.stats["keys"] += len(keys)
+        self.stats["max_batch"] = max(self.stats["max_batch"], len(keys))
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, {}
+        if not batch:
+            return
+        self._count(list(batch))
+        task = asyncio.get_running_loop().create_task(self._run(batch))
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _run(self, batch: dict[K, asyncio.Future]) -> None:
+        try:
+            results = await self.fetch(list(batch))
+            if len(results) != len(batch):
+                raise ValueError(f"batch fetch returned {len(results)} results for {len(batch)} keys")
+        except asyncio.CancelledError:
+            for fut in batch.values():
+                fut.cancel()
+            raise
+        except Exception as e:
+            for fut in batch.values():
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        for fut, result in zip(batch.values(), results):
+            if not fut.done():
+                fut.set_result(result)
@@ -3,49 +3,110 @@ import time
 from functools import lru_cache
 from typing import Optional
 
+import structlog
+
 try:
     import redis
+    import redis.asyncio as aioredis
 except Exception:  # pragma: no cover
-    redis = None
+    redis = aioredis = None
 
 from ..config import settings
+from .shm_cache import SharedMemoryCache
 
 
 class TTLCache:
     def __init__(self, ttl_seconds: int = 60):
         self.ttl = ttl_seconds
-        self.store: dict[str, tuple[float, str]] = {}
+        self.store: dict[str, tuple[float, str]] = {}  # key -> (expires_at, value)
 
     def get(self, key: str) -> Optional[str]:
         itm = self.store.get(key)
         if not itm:
             return None
-        ts, val = itm
-        if time.time() - ts > self.ttl:
+        expires_at, val = itm
+        if time.time() > expires_at:
             self.store.pop(key, None)
             return None
         return val
 
-    def set(self, key: str, value: str):
-        self.store[key] = (time.time(), value)
+    def set(self, key: str, value: str, ttl: Optional[int] = None):
+        self.store[key] = (time.time() + (self.ttl if ttl is None else ttl), value)
+
+
+log = structlog.get_logger(__name__)
 
+def resolve_backend(backend: str, redis_url: Optional[str]) -> str:
+    """CACHE_BACKEND -> "local" | "redis" | "shm"; misconfiguration fails at startup instead of going per-process."""
+    if backend not in ("auto", "local", "redis", "shm"):
+        raise ValueError(f"CACHE_BACKEND must be auto, local, redis or shm, not {backend!r}")
+    if backend == "redis":
+        if not redis_url:
+            raise ValueError("CACHE_BACKEND=redis requires REDIS_URL")
+        if redis is None:
+            raise ValueError("CACHE_BACKEND=redis requires the redis package")
+    if backend == "auto":
+        return "redis" if redis_url and redis else "local"
+    return backend
 
+
+_backend = resolve_backend(settings.CACHE_BACKEND, settings.REDIS_URL)
 _redis = None
-if settings.REDIS_URL and redis:
-    _redis = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+_aredis = None
+_shm: Optional[SharedMemoryCache] = None
+if _backend == "shm":
+    # one mmap'd table shared by all workers on the host
+    _shm = SharedMemoryCache(
+        settings.SHM_CACHE_PATH,
+        sets=max(1, settings.SHM_CACHE_SLOTS // 8),
+        ways=8,
+        slot_size=settings.SHM_CACHE_SLOT_BYTES,
+    )
+elif _backend == "redis":
+    _timeouts = dict(
+        socket_timeout=settings.REDIS_SOCKET_TIMEOUT_S, socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT_S
+    )
+    _redis = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True, **_timeouts)
+    _aredis = aioredis.Redis.from_url(settings.REDIS_URL, decode_responses=True, **_timeouts)
 
 
 def cache_get(key: str) -> Optional[str]:
+    if _shm:
+        return _shm.get(key)
     if _redis:
         return _redis.get(key)
     return _local_cache.get(key)
 
 
 def cache_set(key: str, value: str, ttl: int = 60):
-    if _redis:
-        _redis.setex(key, ttl, value)
+    if _shm:
+        _shm.set(key, value, ttl)
+    elif _redis:
+        _redis.set(key, value, ex=ttl)
     else:
-        _local_cache.set(key, value)
+        _local_cache.set(key, value, ttl)
+
+
+async def acache_get(key: str) -> Optional[str]:
+    """Event-loop-safe cache_get; a cache outage reads as a miss."""
+    try:
+        if _aredis is not None:
+            return await _aredis.get(key)
+        return cache_get(key)  # in-process / shared memory: no I/O
+    except Exception as e:
+        log.warning("cache_get_failed", key=key, error=str(e))
+        return None
+
+
+async def acache_set(key: str, value: str, ttl: int = 60) -> None:
+    """Event-loop-safe cache_set; a cache outage skips the write."""
+    try:
+        if _aredis is not None:
+            await _aredis.set(key, value, ex=ttl)
+        else:
+            cache_set(key, value, ttl)
+    except Exception as e:
+        log.warning("cache_set_failed", key=key, error=str(e))
 
 
 _local_cache = TTLCache(60)
\ No newline at end of file
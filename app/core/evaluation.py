@@ -67,7 +67,7 @@ async def evaluate_router(yaml_path: str) -> list[EvalResult]:
         expected_any = _as_list(case.get("expect_action", "none")) or ["none"]
         expect_contains: Optional[str] = case.get("expect_contains")
 
-        router_json, _ = call_router_llm(q)
+        router_json, _ = await call_router_llm(q)
         predicted_action = router_json.get("action") if router_json.get("type") == "tool" else "none"
         route_correct = predicted_action in expected_any
 
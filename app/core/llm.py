@@ -1,28 +1,41 @@
 import json
 import time
-from typing import Any
-from tenacity import retry, stop_after_attempt, wait_exponential
-from openai import OpenAI
-from .prompts import TOOL_ROUTER_SYSTEM, ANSWER_POLISH_SYSTEM
+from typing import Any, Optional
+from openai import AsyncOpenAI
+from .prompts import TOOL_ROUTER_SYSTEM, ANSWER_POLISH_SYSTEM, CONVERSATION_SUMMARY_SYSTEM
+from .upstream import upstream_policy
 from ..config import settings
 
 
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
+# Retries/timeouts are owned by the upstream policy (hedge + adaptive timeout + breaker),
+# so the SDK's own retry loop is switched off.
+client = AsyncOpenAI(
+    api_key=settings.OPENAI_API_KEY, max_retries=0, timeout=settings.OPENAI_MAX_TIMEOUT_S
+)
+# short JSON routing calls and long answer completions have very different latency
+# profiles, so each gets its own percentiles (hedge delay, adaptive timeout)
+_router_policy = upstream_policy("openai-router", max_timeout_s=settings.OPENAI_MAX_TIMEOUT_S, min_timeout_s=2.0)
+_answer_policy = upstream_policy("openai-answer", max_timeout_s=settings.OPENAI_MAX_TIMEOUT_S, min_timeout_s=2.0)
+# background work: no hedging (nobody is waiting on it), separate breaker from the user path
+_background_policy = upstream_policy(
+    "openai-background", max_timeout_s=settings.OPENAI_MAX_TIMEOUT_S, min_timeout_s=2.0, hedge=False
+)
 
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(min=1, max=8))
-def call_router_llm(user_message: str) -> tuple[dict[str, Any], float]:
-    """Return routing JSON dict and model latency."""
+async def call_router_llm(
+    user_message: str, model: Optional[str] = None, system_prompt: Optional[str] = None
+) -> tuple[dict[str, Any], float]:
+    """Return routing JSON dict and model latency. `model`/`system_prompt` override the defaults (replay/eval)."""
     start = time.perf_counter()
-    resp = client.chat.completions.create(
-        model=settings.OPENAI_MODEL,
+    resp = await _router_policy.call(lambda: client.chat.completions.create(
+        model=model or settings.OPENAI_MODEL,
         messages=[
-            {"role": "system", "content": TOOL_ROUTER_SYSTEM},
+            {"role": "system", "content": system_prompt or TOOL_ROUTER_SYSTEM},
             {"role": "user", "content": user_message},
         ],
         temperature=0,
         response_format={"type": "json_object"},
-    )
+    ))
     txt = resp.choices[0].message.content
     latency_ms = (time.perf_counter() - start) * 1000
     try:
@@ -32,17 +45,33 @@ def call_router_llm(user_message: str) -> tuple[dict[str, Any], float]:
         return {"type": "final", "answer": txt}, latency_ms
 
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(min=1, max=8))
-def call_answer_llm(prompt: str) -> tuple[str, float]:
+async def call_answer_llm(prompt: str, model: Optional[str] = None) -> tuple[str, float]:
     start = time.perf_counter()
-    resp = client.chat.completions.create(
-        model=settings.OPENAI_MODEL,
+    resp = await _answer_policy.call(lambda: client.chat.completions.create(
+        model=model or settings.OPENAI_MODEL,
         messages=[
             {"role": "system", "content": "You are a helpful, concise AI assistant."},
             {"role": "system", "content": ANSWER_POLISH_SYSTEM},
             {"role": "user", "content": prompt},
         ],
         temperature=0.2,
-    )
+    ))
+    latency_ms = (time.perf_counter() - start) * 1000
+    return resp.choices[0].message.content or "", latency_ms
+
+
+async def call_summary_llm(previous: str, turns: list[tuple[str, str]], max_chars: int) -> tuple[str, float]:
+    """Fold new (role, content) turns into the previous rolling summary."""
+    start = time.perf_counter()
+    transcript = "\n".join(f"{role}: {content}" for role, content in turns)
+    resp = await _background_policy.call(lambda: client.chat.completions.create(
+        model=settings.OPENAI_MODEL,
+        messages=[
+            {"role": "system", "content": CONVERSATION_SUMMARY_SYSTEM.format(max_chars=max_chars)},
+            {"role": "user", "content": f"Previous summary:\n{previous or '(none)'}\n\nNew turns:\n{transcript}"},
+        ],
+        temperature=0,
+        max_tokens=max(64, max_chars // 3),
+    ))
     latency_ms = (time.perf_counter() - start) * 1000
-    return resp.choices[0].message.content or "", latency_ms
\ No newline at end of file
+    return (resp.choices[0].message.content or "").strip()[:max_chars], latency_ms
@@ -0,0 +1,191 @@
+# app/core/maintenance.py
+from __future__ import annotations
+import asyncio
+import fcntl
+import gzip
+import json
+import os
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Iterator, Optional
+
+import structlog
+
+from ..config import settings
+from .memory import MemoryStore
+
+log = structlog.get_logger(__name__)
+
+
+@dataclass
+class CompactionReport:
+    kv_rows_removed: int = 0
+    messages_archived: int = 0
+    summaries_removed: int = 0
+    archive_path: Optional[str] = None
+    bytes_before: int = 0
+    bytes_after: int = 0
+    kv_lookup_ms_before: float = 0.0
+    kv_lookup_ms_after: float = 0.0
+    duration_ms: float = 0.0
+    by_user: dict[str, int] = field(default_factory=dict)
+
+    @property
+    def reclaimed_bytes(self) -> int:
+        return max(0, self.bytes_before - self.bytes_after)
+
+
+class MemoryCompactor:
+    """
+    Retention + compaction for MemoryStore:
+    - collapse superseded KV rows (get_kv only ever reads the newest one),
+    - archive transcripts outside the global / per-user retention window to gzip NDJSON, then delete them,
+    - drop rolling summaries not updated within the retention window (cap-trimmed users keep theirs),
+    - run incremental VACUUM and report reclaimed bytes and KV lookup latency before/after.
+    """
+
+    def __init__(
+        self,
+        mem: MemoryStore,
+        retention_days: Optional[int] = None,
+        retention_days_by_user: Optional[dict[str, int]] = None,
+        max_per_user: Optional[int] = None,
+        archive_dir: Optional[str] = None,
+        batch_size: int = 1000,
+    ):
+        self.mem = mem
+        self.retention_days = retention_days
+        self.retention_days_by_user = retention_days_by_user or {}
+        self.max_per_user = max_per_user
+        self.archive_dir = archive_dir
+        self.batch_size = batch_size
+
+    def _time_kv_lookups(self, keys: list[tuple[str, str, str]]) -> float:
+        if not keys:
+            return 0.0
+        start = time.perf_counter()
+        for u, n, k in keys:
+            self.mem.get_kv(u, n, k, max_age_minutes=None)
+        return (time.perf_counter() - start) * 1000 / len(keys)
+
+    def _archive_path(self) -> Optional[str]:
+        if not self.archive_dir:
+            return None
+        os.makedirs(self.archive_dir, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        return os.path.join(self.archive_dir, f"messages-{stamp}-{os.getpid()}.ndjson.gz")
+
+    def _expire(self, report: CompactionReport, path: Optional[str], **scope) -> None:
+        for user, cutoff in self.mem.retention_cutoffs(**scope).items():
+            after = None
+            while True:
+                rows = self.mem.expired_batch(user, cutoff, after, limit=self.batch_size)
+                if not rows:
+                    break
+                if path:
+                    # one gzip member per batch: the file stays valid even if we stop halfway
+                    with gzip.open(path, "at", encoding="utf-8") as f:
+                        for _, u, r, c, ts in rows:
+                            f.write(json.dumps({"user_id": u, "role": r, "content": c, "ts": str(ts)}) + "\n")
+                    report.archive_path = path
+                self.mem.delete_messages([r[0] for r in rows])
+                report.messages_archived += len(rows)
+                report.by_user[user] = report.by_user.get(user, 0) + len(rows)
+                if len(rows) < self.batch_size:
+                    break
+                after = (rows[-1][4], rows[-1][0])
+
+    def run_once(self) -> CompactionReport:
+        start = time.perf_counter()
+        report = CompactionReport(bytes_before=self.mem.db_size_bytes())
+        sample = self.mem.sample_kv_keys()
+        report.kv_lookup_ms_before = self._time_kv_lookups(sample)
+
+        report.kv_rows_removed = self.mem.compact_kv(self.batch_size)
+
+        path = self._archive_path()
+        for user, days in self.retention_days_by_user.items():
+            self._expire(report, path, max_age_days=days, max_per_user=self.max_per_user, users=[user])
+            report.summaries_removed += self.mem.expire_summaries(days, users=[user])
+        self._expire(
+            report,
+            path,
+            max_age_days=self.retention_days,
+            max_per_user=self.max_per_user,
+            exclude_users=list(self.retention_days_by_user),
+        )
+        report.summaries_removed += self.mem.expire_summaries(
+            self.retention_days, exclude_users=list(self.retention_days_by_user)
+        )
+
+        self.mem.incremental_vacuum()
+        report.bytes_after = self.mem.db_size_bytes()
+        report.kv_lookup_ms_after = self._time_kv_lookups(sample)
+        report.duration_ms = (time.perf_counter() - start) * 1000
+        return report
+
+    @contextmanager
+    def exclusive(self) -> Iterator[bool]:
+        """Non-blocking flock on a file next to the DB; yields False if another process is compacting it."""
+        db = self.mem.engine.url.database
+        if not db or db == ":memory:":
+            yield True
+            return
+        fd = os.open(f"{db}.compact.lock", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            yield True
+        finally:
+            os.close(fd)  # also releases the lock
+
+    def run_locked(self) -> Optional[CompactionReport]:
+        """One background pass: None if another process holds the lock or the DB still needs converting."""
+        with self.exclusive() as owner:
+            if not owner:
+                return None
+            if not self.mem.incremental_vacuum_enabled():
+                # converting needs a full VACUUM under the write lock; never under live traffic
+                log.warning(
+                    "memory_compaction_skipped",
+                    reason="database is not in incremental auto_vacuum mode; run `python -m app.cli compact` once",
+                )
+                return None
+            return self.run_once()
+
+    async def run_forever(self, interval_s: float) -> None:
+        while True:
+            try:
+                report = await asyncio.to_thread(self.run_locked)
+                if report is not None:
+                    log.info(
+                        "memory_compaction",
+                        kv_rows_removed=report.kv_rows_removed,
+                        messages_archived=report.messages_archived,
+                        summaries_removed=report.summaries_removed,
+                        archive_path=report.archive_path,
+                        reclaimed_bytes=report.reclaimed_bytes,
+                        kv_lookup_ms_before=round(report.kv_lookup_ms_before, 3),
+                        kv_lookup_ms_after=round(report.kv_lookup_ms_after, 3),
+                        duration_ms=round(report.duration_ms, 1),
+                    )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:  # keep the loop alive; next run retries
+                log.warning("memory_compaction_failed", error=str(e))
+            await asyncio.sleep(interval_s)
+
+
+def compactor_from_settings(mem: MemoryStore) -> MemoryCompactor:
+    return MemoryCompactor(
+        mem,
+        retention_days=settings.MESSAGES_RETENTION_DAYS,
+        retention_days_by_user=settings.MESSAGES_RETENTION_DAYS_BY_USER,
+        max_per_user=settings.MESSAGES_MAX_PER_USER,
+        archive_dir=settings.MEMORY_ARCHIVE_DIR,
+    )
@@ -1,19 +1,31 @@
 # app/core/memory.py
 from __future__ import annotations
-from typing import Optional
-from sqlalchemy import create_engine, text
-from sqlalchemy.engine import Engine
+import asyncio
+import inspect
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Iterable, Optional
+from sqlalchemy import DateTime, bindparam, create_engine, event, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 
 class MemoryStore:
     def __init__(self, url: str = "sqlite:///./memory.db"):
         self.engine: Engine = create_engine(url, future=True)
         with self.engine.begin() as conn:
+            if self.engine.dialect.name == "sqlite":
+                # only takes effect on a fresh file; older DBs are converted by the first compaction
+                conn.execute(text("PRAGMA auto_vacuum=INCREMENTAL"))
             conn.execute(text(
                 "CREATE TABLE IF NOT EXISTS messages (user_id TEXT, role TEXT, content TEXT, ts DATETIME DEFAULT CURRENT_TIMESTAMP)"
             ))
             conn.execute(text(
                 "CREATE TABLE IF NOT EXISTS kv (user_id TEXT, namespace TEXT, key TEXT, value TEXT, ts DATETIME DEFAULT CURRENT_TIMESTAMP)"
             ))
+            conn.execute(text(
+                "CREATE TABLE IF NOT EXISTS summaries (user_id TEXT PRIMARY KEY, summary TEXT, turns INTEGER, ts DATETIME DEFAULT CURRENT_TIMESTAMP)"
+            ))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_messages_user_ts ON messages (user_id, ts)"))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_kv_lookup ON kv (user_id, namespace, key, ts)"))
 
     def add(self, user_id: str, role: str, content: str):
         with self.engine.begin() as conn:
@@ -48,6 +60,331 @@ class MemoryStore:
             else:
                 row = conn.execute(
                     text("SELECT value FROM kv WHERE user_id=:u AND namespace=:n AND key=:k AND ts >= datetime('now', :window) ORDER BY ts DESC LIMIT 1"),
-                    {"u": user_id, "n": namespace, "k": key, "window": f"- {max_age_minutes} minutes"},
+                    {"u": user_id, "n": namespace, "k": key, "window": f"-{max_age_minutes} minutes"},
                 ).fetchone()
         return row[0] if row else None
+
+    # Rolling per-user conversation summary (see app/core/summary.py)
+    def get_summary(self, user_id: str) -> Optional[tuple[str, int]]:
+        with self.engine.begin() as conn:
+            row = conn.execute(
+                text("SELECT summary, turns FROM summaries WHERE user_id=:u"), {"u": user_id}
+            ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def set_summary(self, user_id: str, summary: str, turns: int) -> None:
+        with self.engine.begin() as conn:
+            conn.execute(
+                text(
+                    "INSERT INTO summaries (user_id, summary, turns) VALUES (:u, :s, :t) "
+                    "ON CONFLICT (user_id) DO UPDATE SET summary=excluded.summary, turns=excluded.turns, ts=CURRENT_TIMESTAMP"
+                ),
+                {"u": user_id, "s": summary, "t": turns},
+            )
+
+    # --- Maintenance (see app/core/maintenance.py); SQLite only ---
+    def compact_kv(self, batch_size: int = 1000) -> int:
+        """
+        Drop KV rows superseded by a newer row for the same (user, namespace, key).
+        Walks rowid ranges, one short transaction each, so `set_kv` on the chat path never waits
+        behind a whole-table delete. The kept row is the one `get_kv` reads (newest ts, then rowid),
+        found with one seek to the end of its group on ix_kv_lookup.
+        """
+        stmt = text(
+            "DELETE FROM kv WHERE rowid > :lo AND rowid <= :hi AND rowid != ("
+            "SELECT newest.rowid FROM kv AS newest WHERE newest.user_id IS kv.user_id AND newest.namespace IS kv.namespace"
+            " AND newest.key IS kv.key ORDER BY newest.ts DESC, newest.rowid DESC LIMIT 1)"
+        )
+        with self.engine.connect() as conn:
+            top = conn.execute(text("SELECT MAX(rowid) FROM kv")).scalar() or 0
+        removed = 0
+        for lo in range(0, top, batch_size):
+            with self.engine.begin() as conn:
+                removed += conn.execute(stmt, {"lo": lo, "hi": lo + batch_size}).rowcount or 0
+        return removed
+
+    def retention_cutoffs(
+        self,
+        max_age_days: Optional[int],
+        max_per_user: Optional[int],
+        users: Optional[Iterable[str]] = None,
+        exclude_users: Optional[Iterable[str]] = None,
+    ) -> dict[str, tuple[str, int]]:
+        """
+        Per user, the (ts, rowid) at or below which transcript rows are outside retention:
+        the later of the age window and the newest row beyond the per-user cap.
+        Computed once per compaction pass, one index probe per user.
+        """
+        if max_age_days is None and max_per_user is None:
+            return {}
+        with self.engine.begin() as conn:
+            window = None
+            if max_age_days is not None:
+                # rowid 0 sorts before every real row, so (window, 0) means "ts < window"
+                window = (conn.execute(text("SELECT datetime('now', :w)"), {"w": f"-{max_age_days} days"}).scalar(), 0)
+            if users is not None:
+                candidates = list(users)
+            else:
+                skip = set(exclude_users or ())
+                candidates = [u for (u,) in conn.execute(text("SELECT DISTINCT user_id FROM messages")) if u not in skip]
+            out: dict[str, tuple[str, int]] = {}
+            for u in candidates:
+                cut = window
+                if max_per_user is not None:
+                    row = conn.execute(
+                        text("SELECT ts, rowid FROM messages WHERE user_id=:u ORDER BY ts DESC, rowid DESC LIMIT 1 OFFSET :cap"),
+                        {"u": u, "cap": max_per_user},
+                    ).first()
+                    if row is not None:
+                        cut = max(cut, (row[0], row[1])) if cut else (row[0], row[1])
+                if cut is not None:
+                    out[u] = cut
+        return out
+
+    def expired_batch(
+        self,
+        user_id: str,
+        cutoff: tuple[str, int],
+        after: Optional[tuple[str, int]] = None,
+        limit: int = 1000,
+    ) -> list[tuple[int, str, str, str, str]]:
+        """Oldest-first keyset batch of (rowid, user_id, role, content, ts) at or below `cutoff`, after `after`."""
+        ats, arid = after or ("", -1)
+        with self.engine.begin() as conn:
+            rows = conn.execute(
+                text(
+                    "SELECT rowid, user_id, role, content, ts FROM messages"
+                    " WHERE user_id=:u AND ts <= :cts AND (ts < :cts OR rowid <= :crid)"
+                    " AND ts >= :ats AND (ts > :ats OR rowid > :arid)"
+                    " ORDER BY ts, rowid LIMIT :lim"
+                ),
+                {"u": user_id, "cts": cutoff[0], "crid": cutoff[1], "ats": ats, "arid": arid, "lim": limit},
+            ).all()
+        return [tuple(r) for r in rows]
+
+    def delete_messages(self, rowids: list[int]) -> int:
+        if not rowids:
+            return 0
+        stmt = text("DELETE FROM messages WHERE rowid IN :ids").bindparams(bindparam("ids", expanding=True))
+        with self.engine.begin() as conn:
+            res = conn.execute(stmt, {"ids": rowids})
+        return res.rowcount or 0
+
+    def expire_summaries(
+        self,
+        max_age_days: Optional[int],
+        users: Optional[Iterable[str]] = None,
+        exclude_users: Optional[Iterable[str]] = None,
+    ) -> int:
+        """Drop summaries not updated within the age window, scoped like `retention_cutoffs`."""
+        if max_age_days is None:
+            return 0
+        sql, params = "DELETE FROM summaries WHERE ts < datetime('now', :w)", {"w": f"-{max_age_days} days"}
+        if users is not None:
+            users = list(users)
+            if not users:
+                return 0
+            sql, params["scope"] = sql + " AND user_id IN :scope", users
+        elif exclude_users:
+            sql, params["scope"] = sql + " AND user_id NOT IN :scope", list(exclude_users)
+        stmt = text(sql)
+        if "scope" in params:
+            stmt = stmt.bindparams(bindparam("scope", expanding=True))
+        with self.engine.begin() as conn:
+            res = conn.execute(stmt, params)
+        return res.rowcount or 0
+
+    def db_size_bytes(self) -> int:
+        with self.engine.connect() as conn:
+            pages = conn.execute(text("PRAGMA page_count")).scalar() or 0
+            size = conn.execute(text("PRAGMA page_size")).scalar() or 0
+        return int(pages) * int(size)
+
+    def incremental_vacuum_enabled(self) -> bool:
+        with self.engine.connect() as conn:
+            return conn.execute(text("PRAGMA auto_vacuum")).scalar() == 2
+
+    def incremental_vacuum(self) -> None:
+        """
+        Return free pages to the OS; converts legacy DBs to incremental mode with one full VACUUM.
+        That VACUUM holds the write lock for its whole run, so only `app.cli compact` should hit it.
+        """
+        with self.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            mode = conn.execute(text("PRAGMA auto_vacuum")).scalar()
+            if mode != 2:
+                conn.execute(text("PRAGMA auto_vacuum=INCREMENTAL"))
+                conn.execute(text("VACUUM"))
+            else:
+                conn.execute(text("PRAGMA incremental_vacuum"))
+
+    def sample_kv_keys(self, n: int = 50) -> list[tuple[str, str, str]]:
+        with self.engine.begin() as conn:
+            rows = conn.execute(
+                text("SELECT DISTINCT user_id, namespace, key FROM kv ORDER BY random() LIMIT :n"),
+                {"n": n},
+            ).all()
+        return [tuple(r) for r in rows]
+
+
+# --- Async backend -----------------------------------------------------------
+# Statements are built once at import so SQLAlchemy's compiled cache and the driver's
+# prepared-statement cache (sqlite3 `cached_statements`, asyncpg `prepared_statement_cache_size`)
+# see the same SQL every time.
+_SQL_ADD = text("INSERT INTO messages (user_id, role, content) VALUES (:u, :r, :c)")
+_SQL_LAST_K = text("SELECT role, content FROM messages WHERE user_id=:u ORDER BY ts DESC LIMIT :k")
+_SQL_SET_KV = text("INSERT INTO kv (user_id, namespace, key, value) VALUES (:u, :n, :k, :v)")
+_SQL_GET_KV = text(
+    "SELECT value FROM kv WHERE user_id=:u AND namespace=:n AND key=:k ORDER BY ts DESC LIMIT 1"
+)
+_SQL_GET_KV_WINDOW = text(
+    "SELECT value FROM kv WHERE user_id=:u AND namespace=:n AND key=:k AND ts >= :since ORDER BY ts DESC LIMIT 1"
+).bindparams(bindparam("since", type_=DateTime()))
+
+_SQL_GET_SUMMARY = text("SELECT summary, turns FROM summaries WHERE user_id=:u")
+_SQL_SET_SUMMARY = text(
+    "INSERT INTO summaries (user_id, summary, turns) VALUES (:u, :s, :t) "
+    "ON CONFLICT (user_id) DO UPDATE SET summary=excluded.summary, turns=excluded.turns, ts=CURRENT_TIMESTAMP"
+)
+
+_DDL = {
+    "sqlite": [
+        "CREATE TABLE IF NOT EXISTS messages (user_id TEXT, role TEXT, content TEXT, ts DATETIME DEFAULT CURRENT_TIMESTAMP)",
+        "CREATE TABLE IF NOT EXISTS kv (user_id TEXT, namespace TEXT, key TEXT, value TEXT, ts DATETIME DEFAULT CURRENT_TIMESTAMP)",
+        "CREATE TABLE IF NOT EXISTS summaries (user_id TEXT PRIMARY KEY, summary TEXT, turns INTEGER, ts DATETIME DEFAULT CURRENT_TIMESTAMP)",
+    ],
+    "postgresql": [
+        "CREATE TABLE IF NOT EXISTS messages (user_id TEXT, role TEXT, content TEXT, ts TIMESTAMP DEFAULT (now() AT TIME ZONE 'utc'))",
+        "CREATE TABLE IF NOT EXISTS kv (user_id TEXT, namespace TEXT, key TEXT, value TEXT, ts TIMESTAMP DEFAULT (now() AT TIME ZONE 'utc'))",
+        "CREATE TABLE IF NOT EXISTS summaries (user_id TEXT PRIMARY KEY, summary TEXT, turns INTEGER, ts TIMESTAMP DEFAULT (now() AT TIME ZONE 'utc'))",
+    ],
+}
+_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_messages_user_ts ON messages (user_id, ts)",
+    "CREATE INDEX IF NOT EXISTS ix_kv_lookup ON kv (user_id, namespace, key, ts)",
+]
+
+
+def async_url(url: str) -> str:
+    """Map a plain DB URL onto its async driver (aiosqlite / asyncpg)."""
+    u = make_url(url)
+    if u.drivername == "sqlite":
+        u = u.set(drivername="sqlite+aiosqlite")
+    elif u.drivername in ("postgresql", "postgres", "postgresql+psycopg2"):
+        u = u.set(drivername="postgresql+asyncpg")
+    return u.render_as_string(hide_password=False)
+
+
+class AsyncMemoryStore:
+    """Same interface as MemoryStore, but every method is a coroutine on an async engine."""
+
+    def __init__(
+        self,
+        url: str = "sqlite:///./memory.db",
+        pool_size: int = 10,
+        max_overflow: int = 10,
+        pool_timeout: float = 5.0,
+        statement_cache_size: int = 256,
+    ):
+        url = async_url(url)
+        self.dialect = make_url(url).get_backend_name()
+        kwargs: dict[str, Any] = {"pool_size": pool_size, "max_overflow": max_overflow, "pool_timeout": pool_timeout}
+        if self.dialect == "postgresql":
+            kwargs.update(
+                pool_pre_ping=True,
+                pool_recycle=1800,
+                connect_args={"prepared_statement_cache_size": statement_cache_size},
+            )
+        else:
+            # SQLite has a single writer: queueing in the pool is FIFO, whereas busy-waiting
+            # on the file lock backs off with sleeps and blows up the tail
+            kwargs.update(pool_size=min(pool_size, 4), max_overflow=0)
+            kwargs["connect_args"] = {"cached_statements": statement_cache_size}
+        self.engine: AsyncEngine = create_async_engine(url, **kwargs)
+        if self.dialect == "sqlite":
+            event.listen(self.engine.sync_engine, "connect", _sqlite_tune)
+        self._ready = False
+        self._init_lock = asyncio.Lock()
+
+    async def _ensure_schema(self) -> None:
+        if self._ready:
+            return
+        async with self._init_lock:
+            if self._ready:
+                return
+            async with self.engine.begin() as conn:
+                for ddl in _DDL.get(self.dialect, _DDL["sqlite"]) + _INDEXES:
+                    await conn.execute(text(ddl))
+            self._ready = True
+
+    async def add(self, user_id: str, role: str, content: str):
+        await self._ensure_schema()
+        async with self.engine.begin() as conn:
+            await conn.execute(_SQL_ADD, {"u": user_id, "r": role, "c": content})
+
+    async def last_k(self, user_id: str, k: int = 6) -> list[tuple[str, str]]:
+        await self._ensure_schema()
+        async with self.engine.connect() as conn:
+            rows = (await conn.execute(_SQL_LAST_K, {"u": user_id, "k": k})).all()
+        return [(r[0], r[1]) for r in reversed(rows)]
+
+    async def set_kv(self, user_id: str, namespace: str, key: str, value: str) -> None:
+        await self._ensure_schema()
+        async with self.engine.begin() as conn:
+            await conn.execute(_SQL_SET_KV, {"u": user_id, "n": namespace, "k": key, "v": value})
+
+    async def get_kv(self, user_id: str, namespace: str, key: str, max_age_minutes: Optional[int] = 24 * 60) -> Optional[str]:
+        await self._ensure_schema()
+        params: dict[str, Any] = {"u": user_id, "n": namespace, "k": key}
+        async with self.engine.connect() as conn:
+            if max_age_minutes is None:
+                row = (await conn.execute(_SQL_GET_KV, params)).fetchone()
+            else:
+                since = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(minutes=max_age_minutes)
+                row = (await conn.execute(_SQL_GET_KV_WINDOW, {**params, "since": since})).fetchone()
+        return row[0] if row else None
+
+    async def get_summary(self, user_id: str) -> Optional[tuple[str, int]]:
+        await self._ensure_schema()
+        async with self.engine.connect() as conn:
+            row = (await conn.execute(_SQL_GET_SUMMARY, {"u": user_id})).fetchone()
+        return (row[0], row[1]) if row else None
+
+    async def set_summary(self, user_id: str, summary: str, turns: int) -> None:
+        await self._ensure_schema()
+        async with self.engine.begin() as conn:
+            await conn.execute(_SQL_SET_SUMMARY, {"u": user_id, "s": summary, "t": turns})
+
+    async def close(self) -> None:
+        await self.engine.dispose()
+
+
+def _sqlite_tune(dbapi_conn, _record) -> None:
+    # WAL lets readers proceed while a writer commits; NORMAL sync is safe under WAL.
+    # auto_vacuum must come first: switching to WAL writes the header of a new file, after
+    # which the mode only changes with a full VACUUM (a no-op on existing files)
+    cur = dbapi_conn.cursor()
+    cur.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    cur.execute("PRAGMA journal_mode=WAL")
+    cur.execute("PRAGMA synchronous=NORMAL")
+    cur.execute("PRAGMA busy_timeout=5000")
+    cur.close()
+
+
+async def call_store(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Await an AsyncMemoryStore method; push a sync MemoryStore method off the event loop."""
+    if inspect.iscoroutinefunction(fn):
+        return await fn(*args, **kwargs)
+    return await asyncio.to_thread(fn, *args, **kwargs)
+
+
+def make_memory_store():
+    from ..config import settings
+
+    if settings.MEMORY_BACKEND == "async":
+        return AsyncMemoryStore(
+            settings.MEMORY_DB_URL,
+            pool_size=settings.MEMORY_POOL_SIZE,
+            max_overflow=settings.MEMORY_MAX_OVERFLOW,
+            pool_timeout=settings.MEMORY_POOL_TIMEOUT_S,
+        )
+    return MemoryStore(settings.MEMORY_DB_URL)
@@ -0,0 +1,185 @@
+# app/core/profiling.py
+from __future__ import annotations
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from types import FrameType
+from typing import Callable, Optional
+
+import structlog
+
+log = structlog.get_logger(__name__)
+
+# leaf frames of threads that are parked, not working (selector wait, idle pool workers, ...)
+_IDLE = {("selectors.py", "select"), ("threading.py", "wait"), ("queue.py", "get"), ("thread.py", "_worker")}
+
+
+def _label(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{frame.f_globals.get('__name__', '?')}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def fold_stack(frame: FrameType, max_depth: int = 64) -> Optional[str]:
+    """Root-first `a;b;c` stack for flamegraph tools, or None if the thread is idle."""
+    if (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in _IDLE:
+        return None
+    labels = []
+    f: Optional[FrameType] = frame
+    while f is not None and len(labels) < max_depth:
+        labels.append(_label(f))
+        f = f.f_back
+    return ";".join(reversed(labels))
+
+
+class StackSampler:
+    """Statistical profiler: samples every thread's stack each `interval_s` from a background thread.
+
+    Unlike cProfile it adds no per-call overhead and also sees to_thread/executor work.
+    `folded()` is Brendan Gregg's folded format (`thread;root;...;leaf count`),
+    ready for flamegraph.pl, speedscope or inferno.
+    """
+
+    def __init__(self, interval_s: float = 0.005, max_depth: int = 64):
+        self.interval_s = interval_s
+        self.max_depth = max_depth
+        self.counts: Counter[str] = Counter()
+        self.ticks = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()  # at most one in-flight sample
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval_s):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for tid, frame in sys._current_frames().items():
+                if tid == me:
+                    continue
+                stack = fold_stack(frame, self.max_depth)
+                if stack is not None:
+                    self.counts[f"{names.get(tid, tid)};{stack}"] += 1
+            self.ticks += 1
+
+    def folded(self) -> str:
+        return "\n".join(f"{stack} {n}" for stack, n in self.counts.most_common())
+
+
+class RequestProfiler:
+    """Runs a StackSampler while the next `n` armed requests complete, then keeps the result."""
+
+    def __init__(self, interval_s: float = 0.005, max_requests: int = 500):
+        self.interval_s = interval_s
+        self.max_requests = max_requests
+        self.remaining = 0
+        self._sampler: Optional[StackSampler] = None
+        self._started_at: Optional[float] = None
+        self.last: Optional[dict] = None
+
+    @property
+    def armed(self) -> bool:
+        return self.remaining > 0
+
+    def arm(self, requests: int, interval_s: Optional[float] = None) -> dict:
+        if self._sampler is not None:
+            self._sampler.stop()
+        self.remaining = max(1, min(requests, self.max_requests))
+        self._sampler = StackSampler(interval_s or self.interval_s)
+        self._started_at = None
+        return self.status()
+
+    def request_started(self) -> None:
+        if self.armed and self._sampler is not None and not self._sampler.running:
+            self._started_at = time.time()
+            self._sampler.start()
+
+    def request_finished(self) -> None:
+        if not self.armed or self._sampler is None or not self._sampler.running:
+            return
+        self.remaining -= 1
+        if self.remaining == 0:
+            sampler, self._sampler = self._sampler, None
+            sampler.stop()
+            self.last = {
+                "started_at": self._started_at,
+                "duration_s": round(time.time() - (self._started_at or time.time()), 3),
+                "ticks": sampler.ticks,
+                "folded": sampler.folded(),
+            }
+
+    def status(self) -> dict:
+        last = self.last or {}
+        return {
+            "armed": self.armed,
+            "remaining": self.remaining,
+            "sampling": self._sampler is not None and self._sampler.running,
+            "last_capture": {k: v for k, v in last.items() if k != "folded"} or None,
+        }
+
+
+class LoopWatchdog:
+    """Logs the event loop thread's stack when it has not run for `threshold_s`.
+
+    `heartbeat()` returns the monotonic time the loop last ran (the admission LoopLagMonitor's
+    `beat`), so no second timer task runs on the loop; a separate thread notices a stale beat
+    while the loop is still blocked, so the logged stack is the offending call, not its aftermath.
+    """
+
+    def __init__(self, heartbeat: Callable[[], float], threshold_s: float = 0.5, interval_s: Optional[float] = None):
+        self.heartbeat = heartbeat
+        self.threshold_s = threshold_s
+        self.interval_s = interval_s or threshold_s / 4
+        self.stalls = 0
+        self.last_stall: Optional[dict] = None
+        self._loop_tid: Optional[int] = None
+        self._started = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Call from the event loop's thread."""
+        self._loop_tid = threading.get_ident()
+        self._started = time.monotonic()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _watch(self) -> None:
+        reported = None
+        while not self._stop.wait(self.interval_s):
+            beat = max(self.heartbeat(), self._started)  # a beat from before start() isn't a stall
+            blocked = time.monotonic() - beat
+            if blocked < self.threshold_s or beat == reported:
+                continue
+            reported = beat  # one report per stall
+            frame = sys._current_frames().get(self._loop_tid)
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else ""
+            self.stalls += 1
+            self.last_stall = {"at": time.time(), "blocked_ms": round(blocked * 1000), "stack": stack}
+            log.warning("event_loop_blocked", blocked_ms=round(blocked * 1000), stack=stack)
+
+    def snapshot(self) -> dict:
+        return {"threshold_ms": round(self.threshold_s * 1000), "stalls": self.stalls, "last_stall": self.last_stall}
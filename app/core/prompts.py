@@ -65,3 +65,15 @@ ANSWER_POLISH_SYSTEM = """
   - If the tool output indicates an error (e.g., couldn't geocode), relay it briefly and
     suggest the missing input.
 """
+
+CONVERSATION_SUMMARY_SYSTEM = """
+  You maintain a compact running summary of a conversation between a user and an assistant.
+
+  Rules:
+  - You receive the previous summary (may be empty) and the newest turns; return the updated summary.
+  - Keep facts the user may refer back to: names, places, tickers, preferences, open questions,
+    and conclusions reached. Drop pleasantries and anything superseded by newer turns.
+  - Never invent details. Tool figures (prices, temperatures) are point-in-time; keep them only
+    if the user is likely to compare against them, and mark them as earlier values.
+  - Plain text, third person, at most {max_chars} characters. Return ONLY the summary.
+"""
@@ -0,0 +1,311 @@
+# app/core/replay.py
+"""
+Replay recorded user turns through two Router configurations and diff the routing
+decisions and per-stage latencies.
+
+Turns stream from a SQLite `messages` table (rowid keyset pagination) or from
+NDJSON (plain or .gz, e.g. compaction archives), so datasets of any size run in
+constant memory. Tools and the answer LLM are stubbed by default so only the
+router differs between runs; the router LLM can be live (per-config model /
+system prompt) or served from a recording (indexed on disk, not held in memory).
+"""
+from __future__ import annotations
+import asyncio
+import contextvars
+import gzip
+import json
+import os
+import random
+import tempfile
+import time
+from dataclasses import dataclass, field
+from typing import Any, Iterator, Optional, TextIO
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+
+from .context import ContextManager
+from .llm import call_answer_llm, call_router_llm
+from .memory import MemoryStore
+from .router import Router
+from ..tools import ToolRegistry, WeatherTool, StocksTool
+
+
+@dataclass
+class Turn:
+    seq: int
+    user_id: str
+    content: str
+
+
+def iter_db_turns(url: str, batch_size: int = 1000, limit: Optional[int] = None) -> Iterator[Turn]:
+    """User turns from a SQLite `messages` table in insertion order; one small keyset query per batch."""
+    if make_url(url).get_backend_name() != "sqlite":
+        # only SQLite's schema has a stable insertion key (rowid); export other stores to NDJSON
+        raise ValueError(f"replay reads SQLite databases or .ndjson[.gz] exports, not {make_url(url).get_backend_name()}")
+    engine = create_engine(url, future=True)
+    last, seen = 0, 0
+    try:
+        while limit is None or seen < limit:
+            n = batch_size if limit is None else min(batch_size, limit - seen)
+            with engine.connect() as conn:
+                rows = conn.execute(
+                    text(
+                        "SELECT rowid, user_id, content FROM messages "
+                        "WHERE role='user' AND rowid > :last ORDER BY rowid LIMIT :n"
+                    ),
+                    {"last": last, "n": n},
+                ).all()
+            if not rows:
+                return
+            for rid, user_id, content in rows:
+                yield Turn(rid, user_id, content)
+            last = rows[-1][0]
+            seen += len(rows)
+    finally:
+        engine.dispose()
+
+
+def iter_ndjson_turns(path: str, limit: Optional[int] = None) -> Iterator[Turn]:
+    """User turns from NDJSON lines with user_id/role/content (the compaction archive format)."""
+    opener = gzip.open if path.endswith(".gz") else open
+    seen = 0
+    with opener(path, "rt", encoding="utf-8") as f:
+        for lineno, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            if row.get("role", "user") != "user":
+                continue
+            yield Turn(lineno, row["user_id"], row["content"])
+            seen += 1
+            if limit is not None and seen >= limit:
+                return
+
+
+def iter_turns(source: str, limit: Optional[int] = None) -> Iterator[Turn]:
+    if source.endswith((".ndjson", ".jsonl", ".ndjson.gz", ".jsonl.gz")):
+        return iter_ndjson_turns(source, limit)
+    url = source if "://" in source else f"sqlite:///{source}"
+    return iter_db_turns(url, limit=limit)
+
+
+class RecordingMiss(KeyError):
+    """A replayed message has no routing in the config's recording."""
+
+
+@dataclass
+class ReplayConfig:
+    name: str
+    model: Optional[str] = None
+    router_prompt: Optional[str] = None  # full system prompt text; None = TOOL_ROUTER_SYSTEM
+    recording: Optional[str] = None  # NDJSON {"message", "routing"} served instead of calling the router LLM
+    record_to: Optional[str] = None  # write live router responses here for later replays
+
+
+class LatencyStats:
+    """Count/mean plus a fixed-size reservoir for percentiles, so memory stays flat."""
+
+    def __init__(self, reservoir: int = 10_000):
+        self.n = 0
+        self.total = 0.0
+        self.sample: list[float] = []
+        self.reservoir = reservoir
+
+    def add(self, ms: float) -> None:
+        self.n += 1
+        self.total += ms
+        if len(self.sample) < self.reservoir:
+            self.sample.append(ms)
+        else:
+            j = random.randrange(self.n)
+            if j < self.reservoir:
+                self.sample[j] = ms
+
+    def summary(self) -> dict[str, float]:
+        xs = sorted(self.sample)
+        if not xs:
+            return {"n": 0}
+
+        def pct(q: float) -> float:
+            return round(xs[min(len(xs) - 1, int(q * len(xs)))], 2)
+
+        return {"n": self.n, "mean": round(self.total / self.n, 2), "p50": pct(0.5), "p95": pct(0.95), "p99": pct(0.99)}
+
+
+_stages: contextvars.ContextVar[dict[str, float]] = contextvars.ContextVar("replay_stages")
+
+
+def _timed(stage: str, fn):
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await fn(*args, **kwargs)
+        finally:
+            stages = _stages.get()
+            stages[stage] = stages.get(stage, 0.0) + (time.perf_counter() - start) * 1000
+
+    return wrapper
+
+
+class StubTool:
+    def __init__(self, tool):
+        self.name = tool.name
+        self.description = tool.description
+        self.input_schema = tool.input_schema
+
+    async def run(self, **kwargs) -> str:
+        return f"[stub {self.name}] {json.dumps(kwargs, sort_keys=True)}"
+
+
+async def stub_answer_llm(prompt: str, model: Optional[str] = None) -> tuple[str, float]:
+    return "[stub answer]", 0.0
+
+
+class _TimedTool:
+    def __init__(self, tool):
+        self.name, self.description, self.input_schema = tool.name, tool.description, tool.input_schema
+        self.run = _timed("tool", tool.run)
+
+
+class ReplayRunner:
+    """One Router per config, isolated state (temp memory.db), timed stages."""
+
+    def __init__(self, cfg: ReplayConfig, workdir: str, live_tools: bool = False, live_answers: bool = False):
+        self.cfg = cfg
+        registry = ToolRegistry()
+        for tool in (WeatherTool(), StocksTool()):
+            registry.register(_TimedTool(tool if live_tools else StubTool(tool)))
+        self.mem = MemoryStore(f"sqlite:///{os.path.join(workdir, cfg.name + '.db')}")
+        ctx = ContextManager(self.mem)
+        self._recorded = bool(cfg.recording)
+        self._record_f: Optional[TextIO] = None
+        if cfg.recording:
+            self._index_recording(cfg.recording)
+        if cfg.record_to:
+            self._record_f = open(cfg.record_to, "w", encoding="utf-8")
+
+        async def answer(prompt: str) -> tuple[str, float]:
+            if live_answers:
+                return await call_answer_llm(prompt, model=cfg.model)
+            return await stub_answer_llm(prompt)
+
+        self.router = Router(
+            registry, self.mem, ctx, router_llm=_timed("router_llm", self._route), answer_llm=_timed("answer_llm", answer)
+        )
+        self.stats: dict[str, LatencyStats] = {}
+        self.errors = 0
+
+    def _index_recording(self, path: str, batch_size: int = 1000) -> None:
+        # streamed into the runner's scratch DB so recordings of any size stay out of memory
+        with self.mem.engine.begin() as conn:
+            conn.execute(text("CREATE TABLE recording (message TEXT PRIMARY KEY, routing TEXT)"))
+            insert = text("INSERT OR REPLACE INTO recording (message, routing) VALUES (:m, :r)")
+            batch: list[dict[str, str]] = []
+            with open(path, "r", encoding="utf-8") as f:
+                for row in map(json.loads, filter(str.strip, f)):
+                    batch.append({"m": row["message"], "r": json.dumps(row["routing"])})
+                    if len(batch) >= batch_size:
+                        conn.execute(insert, batch)
+                        batch.clear()
+            if batch:
+                conn.execute(insert, batch)
+
+    async def _route(self, user_text: str) -> tuple[dict[str, Any], float]:
+        if self._recorded:
+            with self.mem.engine.connect() as conn:
+                raw = conn.execute(text("SELECT routing FROM recording WHERE message=:m"), {"m": user_text}).scalar()
+            if raw is None:
+                raise RecordingMiss(user_text[:80])
+            return json.loads(raw), 0.0
+        routing, lat = await call_router_llm(user_text, model=self.cfg.model, system_prompt=self.cfg.router_prompt)
+        if self._record_f:
+            self._record_f.write(json.dumps({"message": user_text, "routing": routing}) + "\n")
+        return routing, lat
+
+    async def run(self, turn: Turn) -> dict[str, Any]:
+        stages: dict[str, float] = {}
+        _stages.set(stages)
+        start = time.perf_counter()
+        try:
+            _, used_tool, *_ = await self.router.route_and_answer(turn.user_id, turn.content)
+            action, error = used_tool or "none", None
+        except Exception as e:
+            self.errors += 1
+            action, error = "error", f"{type(e).__name__}: {e}"
+        stages["total"] = (time.perf_counter() - start) * 1000
+        for stage, ms in stages.items():
+            self.stats.setdefault(stage, LatencyStats()).add(ms)
+        return {"action": action, "error": error, "ms": {k: round(v, 2) for k, v in stages.items()}}
+
+    def close(self) -> None:
+        if self._record_f:
+            self._record_f.close()
+        self.mem.engine.dispose()
+
+
+@dataclass
+class ReplaySummary:
+    turns: int = 0
+    changed: int = 0
+    transitions: dict[str, int] = field(default_factory=dict)
+    errors: dict[str, int] = field(default_factory=dict)
+    latency_ms: dict[str, dict[str, dict[str, float]]] = field(default_factory=dict)
+
+    @property
+    def agreement(self) -> float:
+        return 1 - self.changed / self.turns if self.turns else 1.0
+
+
+async def replay(
+    turns: Iterator[Turn],
+    a: ReplayConfig,
+    b: ReplayConfig,
+    concurrency: int = 16,
+    out: Optional[TextIO] = None,
+    live_tools: bool = False,
+    live_answers: bool = False,
+) -> ReplaySummary:
+    """
+    Run every turn through both configs with at most `concurrency` turns in flight and write one
+    NDJSON line per turn whose routing changed (or errored) to `out`.
+    """
+    summary = ReplaySummary()
+    with tempfile.TemporaryDirectory() as workdir:
+        runners = [ReplayRunner(cfg, workdir, live_tools, live_answers) for cfg in (a, b)]
+        sem = asyncio.Semaphore(concurrency)
+        inflight: set[asyncio.Task] = set()
+
+        async def one(turn: Turn) -> None:
+            try:
+                ra, rb = await asyncio.gather(runners[0].run(turn), runners[1].run(turn))
+                summary.turns += 1
+                # an errored side (upstream failure, recording miss) is not a routing change
+                if not (ra["error"] or rb["error"]) and ra["action"] != rb["action"]:
+                    summary.changed += 1
+                    key = f"{ra['action']}->{rb['action']}"
+                    summary.transitions[key] = summary.transitions.get(key, 0) + 1
+                if out and (ra["action"] != rb["action"] or ra["error"] or rb["error"]):
+                    out.write(json.dumps({
+                        "seq": turn.seq, "user_id": turn.user_id, "message": turn.content,
+                        a.name: ra, b.name: rb,
+                    }) + "\n")
+            finally:
+                sem.release()
+
+        try:
+            for turn in turns:
+                await sem.acquire()
+                task = asyncio.create_task(one(turn))
+                inflight.add(task)
+                task.add_done_callback(inflight.discard)
+            if inflight:
+                await asyncio.gather(*inflight)
+        finally:
+            for r in runners:
+                r.close()
+
+    for r in runners:
+        summary.errors[r.cfg.name] = r.errors
+        summary.latency_ms[r.cfg.name] = {stage: st.summary() for stage, st in r.stats.items()}
+    return summary
@@ -1,29 +1,205 @@
 from __future__ import annotations
-import os
+import hashlib
+import math
+import re
+import threading
+from array import array
+from collections import Counter
+from typing import Optional
 import faiss
 import numpy as np
+import structlog
+
+log = structlog.get_logger(__name__)
 
 # Minimal FAISS helper; embeddings would typically come from an embedding model.
 
+TOKEN_RE = re.compile(r"\w+", re.U)
+
+
+def tokenize(text: str) -> list[str]:
+    return TOKEN_RE.findall(text.lower())
+
+
+class BM25Index:
+    """Append-only BM25 over an inverted index of packed int32/float32 postings (no per-query copies)."""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: dict[str, tuple[array, array]] = {}  # term -> (doc ids, term freqs)
+        self._doc_len = array("f")
+        self._total_len = 0.0
+
+    def __len__(self) -> int:
+        return len(self._doc_len)
+
+    def add(self, texts: list[str]) -> None:
+        for text in texts:
+            doc_id = len(self._doc_len)
+            terms = Counter(tokenize(text))
+            for term, tf in terms.items():
+                ids, tfs = self._postings.setdefault(term, (array("i"), array("f")))
+                ids.append(doc_id)
+                tfs.append(tf)
+            length = sum(terms.values())
+            self._doc_len.append(length)
+            self._total_len += length
+
+    def top(self, query: str, limit: int, min_idf: float = 0.1) -> dict[int, float]:
+        """Top-`limit` doc ids by BM25. Terms in nearly every doc (idf < min_idf, e.g. role
+        prefixes) are skipped: they add ~nothing to the score but dominate the cost."""
+        n = len(self._doc_len)
+        if not n:
+            return {}
+        doc_len = np.frombuffer(self._doc_len, dtype=np.float32)
+        avgdl = self._total_len / n or 1.0
+        id_parts, score_parts = [], []
+        for term in set(tokenize(query)):
+            post = self._postings.get(term)
+            if post is None:
+                continue
+            df = len(post[0])
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            if idf < min_idf:
+                continue
+            ids = np.frombuffer(post[0], dtype=np.int32)
+            tfs = np.frombuffer(post[1], dtype=np.float32)
+            norm = self.k1 * (1 - self.b + self.b * doc_len[ids] / avgdl)
+            id_parts.append(ids)
+            score_parts.append(idf * tfs * (self.k1 + 1) / (tfs + norm))
+        if not id_parts:
+            return {}
+        ids = np.concatenate(id_parts)
+        scores = np.concatenate(score_parts)
+        if len(id_parts) > 1:
+            # dense accumulate: O(postings + n) beats sort-based np.unique for long postings
+            dense = np.bincount(ids, weights=scores, minlength=n)
+            ids = np.flatnonzero(dense)
+            scores = dense[ids]
+        if len(ids) > limit:
+            keep = np.argpartition(scores, -limit)[-limit:]
+            ids, scores = ids[keep], scores[keep]
+        return dict(zip(ids.tolist(), scores.tolist()))
+
+
 class SimpleIndexer:
-    def __init__(self, dim: int = 384):
+    """
+    Hybrid retrieval over prior turns:
+    - vectors in an exact IndexFlatIP, switched to HNSW once `ann_threshold` docs are stored
+      (built in a background thread; the flat index keeps serving until it is swapped in),
+    - BM25 keyword scores over the same docs,
+    - min-max normalized scores fused as `alpha * vector + (1 - alpha) * bm25`,
+      optionally decayed by recency (`recency_half_life` measured in turns).
+    """
+
+    def __init__(
+        self,
+        dim: int = 384,
+        ann_threshold: int = 50_000,
+        hnsw_m: int = 32,
+        ef_search: int = 512,
+        alpha: float = 0.5,
+        recency_half_life: float | None = None,
+        oversample: int = 4,
+    ):
         self.dim = dim
+        self.ann_threshold = ann_threshold
+        self.hnsw_m = hnsw_m
+        self.ef_search = ef_search
+        self.alpha = alpha
+        self.recency_half_life = recency_half_life
+        self.oversample = oversample
         self.index = faiss.IndexFlatIP(dim)
+        self.keywords = BM25Index()
         self.docs: list[str] = []
+        self._ann_build: Optional[threading.Thread] = None
+        self._ann_ready: Optional[tuple[faiss.Index, int]] = None
+
+    @property
+    def is_ann(self) -> bool:
+        return not isinstance(self.index, faiss.IndexFlat)
 
     def _embed(self, text: str) -> np.ndarray:
         # Toy hashing-based embedding (for demo without API). Replace with real embeddings in prod.
-        rng = np.random.default_rng(abs(hash(text)) % (2**32))
+        # seeded from a stable digest: hash() is salted per process, so vectors would differ between workers
+        seed = int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+        rng = np.random.default_rng(seed)
         v = rng.random(self.dim)
         v /= np.linalg.norm(v) + 1e-9
         return v.astype("float32")
 
+    def _build_ann(self, vecs: np.ndarray) -> None:
+        try:
+            ann = faiss.IndexHNSWFlat(self.dim, self.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+            ann.hnsw.efSearch = self.ef_search
+            ann.add(vecs)  # faiss releases the GIL here
+            self._ann_ready = (ann, len(vecs))
+        except Exception as e:
+            log.warning("hnsw_build_failed", docs=len(vecs), error=str(e))
+
+    def _swap_ann(self) -> None:
+        if self._ann_build is None or self._ann_build.is_alive():
+            return
+        ready, self._ann_build, self._ann_ready = self._ann_ready, None, None
+        if ready is None:
+            return  # build failed; the next add retries
+        ann, built = ready
+        if self.index.ntotal > built:  # turns added while the graph was building
+            ann.add(self.index.reconstruct_n(built, self.index.ntotal - built))
+        self.index = ann
+
+    def wait_for_ann(self, timeout: Optional[float] = None) -> bool:
+        """Block until a pending HNSW build is swapped in (tests/bench); True once ANN is active."""
+        if self._ann_build is not None:
+            self._ann_build.join(timeout)
+            self._swap_ann()
+        return self.is_ann
+
     def add(self, texts: list[str]):
+        if not texts:
+            return
+        self._swap_ann()
         vecs = np.vstack([self._embed(t) for t in texts])
         self.index.add(vecs)
+        self.keywords.add(texts)
         self.docs.extend(texts)
+        if not self.is_ann and self._ann_build is None and self.index.ntotal >= self.ann_threshold:
+            snapshot = self.index.reconstruct_n(0, self.index.ntotal)
+            self._ann_build = threading.Thread(target=self._build_ann, args=(snapshot,), name="hnsw-build", daemon=True)
+            self._ann_build.start()
+
+    def _fuse(self, vec_ids: np.ndarray, vec_scores: np.ndarray, kw: dict[int, float], k: int) -> list[str]:
+        fused: dict[int, float] = {}
+
+        def blend(scores: dict[int, float], weight: float, minmax: bool) -> None:
+            if not scores or weight == 0:
+                return
+            hi = max(scores.values())
+            lo = min(scores.values()) if minmax else 0.0
+            span = (hi - lo) or 1.0
+            for i, s in scores.items():
+                fused[i] = fused.get(i, 0.0) + weight * (s - lo) / span
+
+        # cosine scores share no zero point -> min-max; BM25 is >= 0 with 0 = no match -> scale by max
+        blend({int(i): float(s) for i, s in zip(vec_ids, vec_scores) if i >= 0}, self.alpha, minmax=True)
+        blend(kw, 1 - self.alpha, minmax=False)
+        if self.recency_half_life:
+            newest = len(self.docs) - 1
+            for i in fused:
+                fused[i] *= 0.5 ** ((newest - i) / self.recency_half_life)
+        best = sorted(fused.items(), key=lambda kv: kv[1], reverse=True)[:k]
+        return [self.docs[i] for i, _ in best]
+
+    def search_batch(self, queries: list[str], k: int = 3) -> list[list[str]]:
+        k = min(k, len(self.docs))
+        if k <= 0 or not queries:
+            return [[] for _ in queries]
+        self._swap_ann()
+        pool = min(k * self.oversample, len(self.docs))
+        qv = np.vstack([self._embed(q) for q in queries])
+        scores, ids = self.index.search(qv, pool)  # one FAISS call for the whole batch
+        return [self._fuse(ids[j], scores[j], self.keywords.top(q, pool), k) for j, q in enumerate(queries)]
 
     def search(self, query: str, k: int = 3) -> list[str]:
-        qv = self._embed(query)[None, :]
-        _, idx = self.index.search(qv, k)
-        return [self.docs[i] for i in idx[0] if i < len(self.docs)]
\ No newline at end of file
+        return self.search_batch([query], k=k)[0]
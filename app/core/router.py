@@ -6,24 +6,27 @@ from ..models.schemas import RoutingDecision
 from .context import ContextManager
 
 class Router:
-    def __init__(self, tools: ToolRegistry, mem, ctx: ContextManager):
+    def __init__(self, tools: ToolRegistry, mem, ctx: ContextManager, router_llm=None, answer_llm=None):
         self.tools = tools
         self.mem = mem
         self.ctx = ctx
+        # swappable for replay/eval (different model or prompt, recorded or stubbed responses)
+        self.router_llm = router_llm or call_router_llm
+        self.answer_llm = answer_llm or call_answer_llm
 
     async def route_and_answer(self, user_id: str, user_text: str) -> tuple[str, Optional[str], float, float]:
-        routing_json, model_latency = call_router_llm(user_text)
+        routing_json, model_latency = await self.router_llm(user_text)
 
         if routing_json.get("type") == "tool":
             action = routing_json.get("action")
             tool_input = (routing_json.get("input") or {}).copy()
             tool = self.tools.get(action)
             if not tool:
-                answer, ans_lat = call_answer_llm(user_text)
+                answer, ans_lat = await self.answer_llm(user_text)
                 return answer, None, 0.0, ans_lat
 
             # dynamic, generic backfill using the tool's declared schema
-            tool_input = self.ctx.resolve_tool_inputs(
+            tool_input = await self.ctx.resolve_tool_inputs(
                 user_id=user_id,
                 tool_name=action,
                 tool_input=tool_input,
@@ -32,11 +35,11 @@ class Router:
             )
 
             raw = await tool.run(**tool_input)
-            self.ctx.persist_tool_memory(user_id, action, tool_input)
+            await self.ctx.persist_tool_memory(user_id, action, tool_input)
 
             # minimal, guarded polish; optionally add 1–2 relevant snippets
             snippets = []
-            if self.ctx.should_include_history_for_polish(user_id, action, user_text):
+            if await self.ctx.should_include_history_for_polish(user_id, action, user_text):
                 snippets = self.ctx.select_snippets(user_id, user_text, k=2)
 
             guard = (
@@ -44,14 +47,16 @@ class Router:
                 "Do not add unrelated information."
             )
             snippet_block = ("\nRelevant prior context:\n" + "\n".join(snippets)) if snippets else ""
-            final, ans_lat = call_answer_llm(
+            final, ans_lat = await self.answer_llm(
                 f"User asked: {user_text}\nTool {action} returned: {raw}.{snippet_block}\n{guard}"
             )
             return final, action, model_latency, ans_lat
 
-        # LLM-only path: include at most top-2 relevant snippets, not full history
+        # LLM-only path: rolling summary + at most top-2 relevant snippets, never full history
+        summary = await self.ctx.conversation_summary(user_id)
         snippets = self.ctx.select_snippets(user_id, user_text, k=2)
-        context = ("\nRelevant prior context:\n" + "\n".join(snippets)) if snippets else ""
+        context = ("\nConversation so far:\n" + summary) if summary else ""
+        context += ("\nRelevant prior context:\n" + "\n".join(snippets)) if snippets else ""
         prompt = (user_text + context) if context else user_text
-        answer, ans_lat = call_answer_llm(prompt)
+        answer, ans_lat = await self.answer_llm(prompt)
         return answer, None, 0.0, ans_lat
\ No newline at end of file
@@ -0,0 +1,137 @@
+# app/core/shm_cache.py
+from __future__ import annotations
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Optional
+
+# File layout (little endian):
+#   header  | magic(8) sets(u32) ways(u32) slot_size(u32) pad -> 64 bytes
+#   slots   | sets * ways slots of `slot_size` bytes, grouped by set
+# slot:     | seq(u32) hash(u64) expires_at(f64) key_len(u16) val_len(u32) pad(6) | key | value
+_MAGIC = b"QASHM\x00\x00\x01"
+_HDR = struct.Struct("<8sIII")
+_HDR_SIZE = 64
+_SLOT = struct.Struct("<IQdHI6x")  # 32 bytes
+_SEQ = struct.Struct("<I")
+_TAG = struct.Struct("<4xQ")  # just the hash, for the fast scan over a set
+
+
+def _hash64(key: bytes) -> int:
+    # stable across processes (unlike hash()); 0 is reserved for "empty"
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little") or 1
+
+
+class SharedMemoryCache:
+    """
+    Set-associative cache in an mmap'd file shared by every worker process on the host
+    (put it on /dev/shm so it never touches disk). Values are stored as raw UTF-8 bytes,
+    so a hit is a memory copy — no pickling, no network hop.
+
+    - Reads are lock-free: each slot carries a seqlock counter (odd while being written);
+      a reader retries if the counter moved underneath it.
+    - Writes lock only their set (fcntl byte-range lock across processes + a thread lock).
+    - Eviction is per set: expired slot first, otherwise the slot closest to expiry.
+    - Values too large for a slot are not cached.
+    """
+
+    def __init__(self, path: str, sets: int = 8192, ways: int = 8, slot_size: int = 1024):
+        self.path = path
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            head = os.pread(self._fd, _HDR.size, 0)
+            if len(head) == _HDR.size and head[:8] == _MAGIC:
+                # another worker created it first: adopt its geometry
+                _, sets, ways, slot_size = _HDR.unpack(head)
+            else:
+                os.ftruncate(self._fd, _HDR_SIZE + sets * ways * slot_size)
+                os.pwrite(self._fd, _HDR.pack(_MAGIC, sets, ways, slot_size), 0)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self.sets, self.ways, self.slot_size = sets, ways, slot_size
+        self.capacity = slot_size - _SLOT.size
+        self._mm = mmap.mmap(self._fd, _HDR_SIZE + sets * ways * slot_size)
+        self._thread_lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "sets": 0, "evictions": 0, "too_large": 0}
+
+    def _set_of(self, h: int) -> int:
+        return _HDR_SIZE + (h % self.sets) * self.ways * self.slot_size
+
+    def _read_slot(self, off: int, h: int, key: bytes) -> Optional[str]:
+        mm = self._mm
+        for _ in range(4):
+            seq, sh, expires_at, klen, vlen = _SLOT.unpack_from(mm, off)
+            if seq & 1:
+                continue  # writer in progress
+            if sh != h:
+                return None
+            if klen > self.capacity or klen + vlen > self.capacity:
+                continue  # torn header; re-read
+            data = mm[off + _SLOT.size : off + _SLOT.size + klen + vlen]
+            if _SEQ.unpack_from(mm, off)[0] != seq:
+                continue
+            if data[:klen] != key or expires_at < time.time():
+                return None
+            return data[klen:].decode("utf-8")
+        return None
+
+    def get(self, key: str) -> Optional[str]:
+        kb = key.encode("utf-8")
+        h = _hash64(kb)
+        base = self._set_of(h)
+        mm, tag, step = self._mm, _TAG.unpack_from, self.slot_size
+        for off in range(base, base + self.ways * step, step):
+            if tag(mm, off)[0] != h:
+                continue
+            val = self._read_slot(off, h, kb)
+            if val is not None:
+                self.stats["hits"] += 1
+                return val
+        self.stats["misses"] += 1
+        return None
+
+    def set(self, key: str, value: str, ttl: float = 60) -> bool:
+        kb, vb = key.encode("utf-8"), value.encode("utf-8")
+        if len(kb) + len(vb) > self.capacity or len(kb) > 0xFFFF:
+            self.stats["too_large"] += 1
+            return False
+        h = _hash64(kb)
+        base = self._set_of(h)
+        span = self.ways * self.slot_size
+        now = time.time()
+        with self._thread_lock:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, span, base)
+            try:
+                target, victim, victim_exp = None, base, float("inf")
+                for way in range(self.ways):
+                    off = base + way * self.slot_size
+                    _, sh, expires_at, klen, _ = _SLOT.unpack_from(self._mm, off)
+                    if sh == h and self._mm[off + _SLOT.size : off + _SLOT.size + klen] == kb:
+                        target = off
+                        break
+                    if sh == 0 or expires_at < now:
+                        expires_at = float("-inf")  # free or expired: best possible victim
+                    if expires_at < victim_exp:
+                        victim, victim_exp = off, expires_at
+                if target is None:
+                    target = victim
+                    if victim_exp != float("-inf"):
+                        self.stats["evictions"] += 1
+                seq = _SEQ.unpack_from(self._mm, target)[0]
+                _SEQ.pack_into(self._mm, target, seq + 1)  # odd: readers back off
+                self._mm[target + _SLOT.size : target + _SLOT.size + len(kb) + len(vb)] = kb + vb
+                _SLOT.pack_into(self._mm, target, seq + 1, h, now + ttl, len(kb), len(vb))
+                _SEQ.pack_into(self._mm, target, seq + 2)
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, span, base)
+        self.stats["sets"] += 1
+        return True
+
+    def close(self) -> None:
+        self._mm.close()
+        os.close(self._fd)
@@ -0,0 +1,56 @@
+# app/core/summary.py
+from __future__ import annotations
+import asyncio
+from typing import Awaitable, Callable, Optional
+
+import structlog
+
+from .llm import call_summary_llm
+from .memory import MemoryStore, AsyncMemoryStore, call_store
+
+log = structlog.get_logger(__name__)
+
+SummarizeFn = Callable[[str, list[tuple[str, str]], int], Awaitable[tuple[str, float]]]
+
+
+class ConversationSummarizer:
+    """
+    Keeps one compact rolling summary per user, stored next to the transcript.
+    Turns are queued per user and folded in by a background task after the response is sent;
+    turns that arrive while a fold is running are batched into the next one, so at most one
+    summarization call per user is ever in flight.
+    """
+
+    def __init__(self, mem: MemoryStore | AsyncMemoryStore, max_chars: int = 1200, summarize: Optional[SummarizeFn] = None):
+        self.mem = mem
+        self.max_chars = max_chars
+        self._summarize = summarize or call_summary_llm
+        self._pending: dict[str, list[tuple[str, str]]] = {}
+        self._workers: dict[str, asyncio.Task] = {}
+
+    def schedule(self, user_id: str, user_text: str, answer: str) -> None:
+        self._pending.setdefault(user_id, []).extend([("user", user_text), ("assistant", answer)])
+        if user_id not in self._workers:
+            self._workers[user_id] = asyncio.create_task(self._drain(user_id))
+
+    async def _drain(self, user_id: str) -> None:
+        try:
+            while self._pending.get(user_id):
+                turns = self._pending.pop(user_id)
+                try:
+                    row = await call_store(self.mem.get_summary, user_id)
+                    previous, count = row if row else ("", 0)
+                    summary, _ = await self._summarize(previous, turns, self.max_chars)
+                    if summary:
+                        await call_store(self.mem.set_summary, user_id, summary, count + len(turns) // 2)
+                except Exception as e:
+                    # losing one fold only costs detail; the next turn folds into the last good summary
+                    log.warning("summary_update_failed", user_id=user_id, error=str(e))
+        finally:
+            # no await between the empty check and this pop, so a later schedule() starts a new worker
+            self._workers.pop(user_id, None)
+
+    async def aclose(self, timeout_s: float = 5.0) -> None:
+        """Let in-flight folds finish on shutdown."""
+        if self._workers:
+            await asyncio.wait(list(self._workers.values()), timeout=timeout_s)
@@ -0,0 +1,245 @@
+# app/core/upstream.py
+from __future__ import annotations
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from ..config import settings
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised without calling upstream while its breaker is open."""
+
+
+def _status(exc: BaseException) -> Optional[int]:
+    status = getattr(exc, "status_code", None) or getattr(getattr(exc, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def _counts_as_failure(exc: BaseException) -> bool:
+    # 4xx (other than 429) means *we* sent a bad request; the upstream itself is healthy
+    status = _status(exc)
+    if status is not None and 400 <= status < 500 and status != 429:
+        return False
+    return True
+
+
+def _worth_hedging(exc: BaseException) -> bool:
+    # a duplicate of a bad request fails the same way, and one into a 429 only adds load
+    return _counts_as_failure(exc) and _status(exc) != 429
+
+
+class CircuitBreaker:
+    """closed -> open after N consecutive failures -> half-open probe after `reset_after_s`."""
+
+    def __init__(self, failure_threshold: int = 5, reset_after_s: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_after_s = reset_after_s
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probe_inflight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_after_s:
+            return "half_open"
+        return "open"
+
+    @property
+    def probing(self) -> bool:
+        return self._probe_inflight
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._probe_inflight:
+            self._probe_inflight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._probe_inflight = False
+
+    def release_probe(self) -> None:
+        # the probe ended without a verdict (cancelled); let the next call probe instead
+        self._probe_inflight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probe_inflight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+class UpstreamPolicy:
+    """
+    Call policy for one upstream (Open-Meteo, Alpha Vantage, OpenAI, ...):
+    - adaptive timeout: `timeout_multiplier` x observed p99, clamped to [min_timeout_s, max_timeout_s];
+      a timed-out call counts as a sample at the timeout it hit, so the timeout widens when the
+      upstream slows down, and the half-open probe gets `max_timeout_s`
+    - hedging: if the first attempt hasn't answered by the observed p95 (or fails fast with an
+      upstream error other than 4xx/429), fire one duplicate and take whichever succeeds first
+    - circuit breaker: fail fast with CircuitOpenError after consecutive failures
+
+    `fn` passed to `call` must be a zero-arg factory returning a fresh awaitable, since a
+    hedge invokes it twice. Only use hedging for idempotent requests.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        min_timeout_s: float = 0.5,
+        max_timeout_s: float = 10.0,
+        timeout_multiplier: float = 3.0,
+        hedge: bool = True,
+        hedge_quantile: float = 0.95,
+        window: int = 200,
+        min_samples: int = 20,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.name = name
+        self.min_timeout_s = min_timeout_s
+        self.max_timeout_s = max_timeout_s
+        self.timeout_multiplier = timeout_multiplier
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.min_samples = min_samples
+        self.breaker = breaker or CircuitBreaker()
+        self._latencies: deque[float] = deque(maxlen=window)
+        self.metrics = {
+            "calls": 0,
+            "successes": 0,
+            "failures": 0,
+            "timeouts": 0,
+            "rejected": 0,
+            "hedges_fired": 0,
+            "hedges_won": 0,
+        }
+
+    def quantile(self, q: float) -> Optional[float]:
+        if len(self._latencies) < self.min_samples:
+            return None
+        xs = sorted(self._latencies)
+        return xs[min(len(xs) - 1, int(q * len(xs)))]
+
+    def timeout(self) -> float:
+        p99 = self.quantile(0.99)
+        if p99 is None:
+            return self.max_timeout_s
+        return min(self.max_timeout_s, max(self.min_timeout_s, p99 * self.timeout_multiplier))
+
+    def hedge_delay(self) -> Optional[float]:
+        return self.quantile(self.hedge_quantile) if self.hedge else None
+
+    async def _attempt(self, fn: Callable[[], Awaitable[T]]) -> T:
+        start = time.perf_counter()
+        result = await fn()
+        self._latencies.append(time.perf_counter() - start)
+        return result
+
+    async def _hedged(self, fn: Callable[[], Awaitable[T]]) -> T:
+        primary = asyncio.create_task(self._attempt(fn))
+        tasks = {primary}
+        try:
+            delay = self.hedge_delay()
+            if delay is None:
+                return await primary
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done and (primary.exception() is None or not _worth_hedging(primary.exception())):
+                return primary.result()  # result, or re-raises a failure a duplicate can't fix
+            # slow past p95, or failed fast: one duplicate request
+            self.metrics["hedges_fired"] += 1
+            secondary = asyncio.create_task(self._attempt(fn))
+            tasks.add(secondary)
+            pending = set(tasks) - done
+            last_exc: Optional[BaseException] = primary.exception() if done else None
+            while pending:
+                finished, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for t in finished:
+                    if t.exception() is None:
+                        if t is secondary:
+                            self.metrics["hedges_won"] += 1
+                        return t.result()
+                    last_exc = t.exception()
+            assert last_exc is not None
+            raise last_exc
+        finally:
+            for t in tasks:
+                if not t.done():
+                    t.cancel()
+
+    async def call(self, fn: Callable[[], Awaitable[T]]) -> T:
+        self.metrics["calls"] += 1
+        if not self.breaker.allow():
+            self.metrics["rejected"] += 1
+            raise CircuitOpenError(f"{self.name} circuit open")
+        timeout = self.max_timeout_s if self.breaker.probing else self.timeout()
+        try:
+            result = await asyncio.wait_for(self._hedged(fn), timeout=timeout)
+        except asyncio.TimeoutError:
+            # censored sample: the call took at least `timeout`
+            self._latencies.append(timeout)
+            self.metrics["timeouts"] += 1
+            self.metrics["failures"] += 1
+            self.breaker.record_failure()
+            raise
+        except Exception as e:
+            if _counts_as_failure(e):
+                self.metrics["failures"] += 1
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            raise
+        except BaseException:
+            # CancelledError (client disconnect, caller's wait_for): no verdict on the upstream
+            self.breaker.release_probe()
+            raise
+        self.metrics["successes"] += 1
+        self.breaker.record_success()
+        return result
+
+    def snapshot(self) -> dict:
+        def ms(v: Optional[float]) -> Optional[float]:
+            return None if v is None else round(v * 1000, 1)
+
+        p50, p95, p99 = (self.quantile(q) for q in (0.5, 0.95, 0.99))
+        return {
+            **self.metrics,
+            "breaker": self.breaker.state,
+            "p50_ms": ms(p50),
+            "p95_ms": ms(p95),
+            "p99_ms": ms(p99),
+            "timeout_ms": ms(self.timeout()),
+        }
+
+
+_policies: dict[str, UpstreamPolicy] = {}
+
+
+def upstream_policy(name: str, **overrides) -> UpstreamPolicy:
+    """Process-wide policy per upstream name; `overrides` apply on first creation only."""
+    pol = _policies.get(name)
+    if pol is None:
+        opts = dict(
+            min_timeout_s=settings.UPSTREAM_MIN_TIMEOUT_S,
+            max_timeout_s=settings.UPSTREAM_MAX_TIMEOUT_S,
+            timeout_multiplier=settings.UPSTREAM_TIMEOUT_MULTIPLIER,
+            hedge=settings.UPSTREAM_HEDGING,
+            hedge_quantile=settings.UPSTREAM_HEDGE_QUANTILE,
+        )
+        opts.update(overrides)
+        breaker = CircuitBreaker(settings.UPSTREAM_BREAKER_FAILURES, settings.UPSTREAM_BREAKER_RESET_S)
+        pol = _policies[name] = UpstreamPolicy(name, breaker=breaker, **opts)
+    return pol
+
+
+def upstream_metrics() -> dict[str, dict]:
+    return {name: pol.snapshot() for name, pol in _policies.items()}
@@ -9,4 +9,11 @@ async def enforce_bearer_auth(authorization: str | None = Header(default=None)):
         raise HTTPException(status_code=401, detail="Missing bearer token")
     token = authorization.removeprefix("Bearer ").strip()
     if token != settings.API_AUTH_TOKEN:
-        raise HTTPException(status_code=403, detail="Invalid token")
\ No newline at end of file
+        raise HTTPException(status_code=403, detail="Invalid token")
+
+
+async def enforce_admin_auth(authorization: str | None = Header(default=None)):
+    # unlike /chat, admin routes are never open: they need API_AUTH_TOKEN configured
+    if settings.API_AUTH_TOKEN is None:
+        raise HTTPException(status_code=403, detail="Admin endpoints require API_AUTH_TOKEN")
+    await enforce_bearer_auth(authorization)
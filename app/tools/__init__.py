@@ -1,5 +1,9 @@
-from .tool_registry import ToolRegistry
-from .weather import WeatherTool
-from .stocks import StocksTool
+from .tool_registry import ToolRegistry, ToolResult, ToolMessage, ToolInputError, TypedTool
+from .weather import WeatherTool, WeatherReport
+from .stocks import StocksTool, StockQuote
+from .refresher import ToolRefresher, CachedTool
 
-__all__ = ["ToolRegistry", "WeatherTool", "StocksTool"]
\ No newline at end of file
+__all__ = [
+    "ToolRegistry", "ToolResult", "ToolMessage", "ToolInputError", "TypedTool",
+    "WeatherTool", "WeatherReport", "StocksTool", "StockQuote", "ToolRefresher", "CachedTool",
+]
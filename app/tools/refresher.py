@@ -0,0 +1,178 @@
+from __future__ import annotations
+import asyncio
+import json
+import math
+import time
+from typing import Any, Optional
+
+from ..core.cache import acache_get, acache_set
+from .tool_registry import Tool, ToolMessage, ToolResult, compact_dumps, normalize_input
+
+
+def cache_key(tool_name: str, kwargs: dict[str, Any]) -> str:
+    norm = {k: str(v).strip().casefold() for k, v in sorted(kwargs.items()) if v not in (None, "")}
+    return f"tool:{tool_name}:{json.dumps(norm, separators=(',', ':'))}"
+
+
+class CachedTool:
+    """
+    Stale-while-revalidate wrapper around a Tool.
+    Input goes through the tool's `normalize()` (if any) before keying, and entries are stored
+    as compact rows `[fetched_at, kind, *fields]`; `run()` renders, `call()` returns the ToolResult.
+    - age <= fresh_ttl: serve from cache
+    - age <= fresh_ttl + max_stale: serve from cache, revalidate in the background
+    - otherwise: call upstream inline (concurrent misses for one key share a single call)
+    """
+
+    def __init__(self, tool: Tool, refresher: "ToolRefresher", fresh_ttl: float, max_stale: float):
+        self.tool = tool
+        self.refresher = refresher
+        self.fresh_ttl = fresh_ttl
+        self.max_stale = max_stale
+        self.name = tool.name
+        self.description = tool.description
+        self.input_schema = tool.input_schema
+        self._inflight: dict[str, asyncio.Future] = {}
+
+    async def _read(self, key: str) -> Optional[tuple[float, ToolResult]]:
+        raw = await acache_get(key)
+        if not raw:
+            return None
+        try:
+            row = json.loads(raw)
+            if isinstance(row, dict):  # entries written before typed results: {"t": ..., "v": "<text>"}
+                return float(row["t"]), ToolMessage(row["v"])
+            return float(row[0]), ToolResult.from_row(row[1:])
+        except Exception:
+            return None
+
+    async def _lookup(self, kwargs: dict[str, Any]) -> ToolResult:
+        lookup = getattr(self.tool, "lookup", None)
+        if lookup is not None:
+            return await lookup(**kwargs)
+        return ToolMessage(await self.tool.run(**kwargs))  # plain str tools
+
+    async def fetch(self, key: str, kwargs: dict[str, Any]) -> ToolResult:
+        """Call upstream once per key at a time and write the result through to the cache."""
+        fut = self._inflight.get(key)
+        if fut is not None:
+            return await asyncio.shield(fut)
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        try:
+            value = await self._lookup(kwargs)
+            ttl = max(1, math.ceil(self.fresh_ttl + self.max_stale))
+            row = [round(time.time(), 3), *value.to_row()]
+            await acache_set(key, compact_dumps(row), ttl=ttl)
+            fut.set_result(value)
+            return value
+        except BaseException as e:
+            fut.set_exception(e)
+            fut.exception()  # mark retrieved so an unawaited failure doesn't warn
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    async def age(self, key: str) -> Optional[float]:
+        entry = await self._read(key)
+        return None if entry is None else time.time() - entry[0]
+
+    async def call(self, **kwargs) -> ToolResult:
+        kwargs = normalize_input(self.tool, kwargs)
+        if isinstance(kwargs, ToolMessage):
+            return kwargs  # rejected before keying: never cached, never sent upstream
+        key = cache_key(self.name, kwargs)
+        self.refresher.touch(self, key, kwargs)
+        entry = await self._read(key)
+        if entry is not None:
+            fetched_at, value = entry
+            age = time.time() - fetched_at
+            if age <= self.fresh_ttl:
+                self.refresher.stats["fresh_hits"] += 1
+                return value
+            if age <= self.fresh_ttl + self.max_stale:
+                self.refresher.stats["stale_hits"] += 1
+                self.refresher.revalidate(self, key, kwargs)
+                return value
+        self.refresher.stats["misses"] += 1
+        return await self.fetch(key, kwargs)
+
+    async def run(self, **kwargs) -> str:
+        return (await self.call(**kwargs)).render()
+
+
+class ToolRefresher:
+    """
+    Tracks per-key request popularity (exponentially decayed counts) across wrapped tools and,
+    every `interval_s`, re-fetches the top-N keys whose age passed `refresh_ahead` of their TTL,
+    so hot keys are refreshed before a user ever sees them expire.
+    """
+
+    def __init__(self, top_n: int = 20, interval_s: float = 5.0, refresh_ahead: float = 0.8, decay: float = 0.5):
+        self.top_n = top_n
+        self.interval_s = interval_s
+        self.refresh_ahead = refresh_ahead
+        self.decay = decay
+        self._popularity: dict[str, tuple[float, CachedTool, dict[str, Any]]] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self.stats = {"fresh_hits": 0, "stale_hits": 0, "misses": 0, "revalidations": 0, "prefetches": 0}
+
+    def wrap(self, tool: Tool, fresh_ttl: Optional[float] = None, max_stale: Optional[float] = None) -> Tool:
+        """Wrap a tool that declares `cache_ttl` (and optionally `max_stale`); others pass through."""
+        fresh_ttl = fresh_ttl if fresh_ttl is not None else getattr(tool, "cache_ttl", None)
+        if not fresh_ttl:
+            return tool
+        max_stale = max_stale if max_stale is not None else getattr(tool, "max_stale", 0)
+        return CachedTool(tool, self, fresh_ttl, max_stale)
+
+    def touch(self, tool: CachedTool, key: str, kwargs: dict[str, Any]) -> None:
+        score = self._popularity.get(key, (0.0, tool, kwargs))[0]
+        self._popularity[key] = (score + 1.0, tool, dict(kwargs))
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _quiet_fetch(self, tool: CachedTool, key: str, kwargs: dict[str, Any]) -> None:
+        try:
+            await tool.fetch(key, kwargs)
+        except Exception:
+            pass  # keep serving the stale value; the next request or cycle retries
+
+    def revalidate(self, tool: CachedTool, key: str, kwargs: dict[str, Any]) -> None:
+        if key in tool._inflight:
+            return
+        self.stats["revalidations"] += 1
+        self._spawn(self._quiet_fetch(tool, key, kwargs))
+
+    def hot_keys(self) -> list[str]:
+        ranked = sorted(self._popularity.items(), key=lambda kv: kv[1][0], reverse=True)
+        return [k for k, _ in ranked[: self.top_n]]
+
+    async def refresh_once(self) -> int:
+        refreshed = 0
+        jobs = []
+        for key in self.hot_keys():
+            _, tool, kwargs = self._popularity[key]
+            age = await tool.age(key)
+            if age is None or age >= tool.fresh_ttl * self.refresh_ahead:
+                if key not in tool._inflight:
+                    jobs.append(self._quiet_fetch(tool, key, kwargs))
+        if jobs:
+            await asyncio.gather(*jobs)
+            refreshed = len(jobs)
+            self.stats["prefetches"] += refreshed
+        # decay so yesterday's hot keys fall out of the top-N
+        for key, (score, tool, kwargs) in list(self._popularity.items()):
+            score *= self.decay
+            if score < 0.05:
+                self._popularity.pop(key, None)
+            else:
+                self._popularity[key] = (score, tool, kwargs)
+        return refreshed
+
+    async def run_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval_s)
+            await self.refresh_once()
@@ -1,23 +1,53 @@
-from typing import Any
+import asyncio
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional
 import httpx
 import yfinance as yf
 from ..config import settings
+from ..core.upstream import upstream_policy
+from .tool_registry import ToolInputError, ToolMessage, ToolResult, TypedTool
 
+TICKER_RE = re.compile(r"^[A-Z0-9^][A-Z0-9.\-=]{0,14}$")  # AAPL, BRK.B, ^GSPC, EURUSD=X
 
-class StocksTool:
+# a timed-out yfinance call keeps its thread until it returns; keep those off the default
+# executor that call_store shares with the sync memory store
+_YF_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="yfinance")
+
+
+class StockQuote(ToolResult):
+    __slots__ = ("ticker", "price", "currency")
+    kind = "q"
+
+    def __init__(self, ticker: str, price: float, currency: Optional[str] = None):
+        self.ticker = ticker
+        self.price = price
+        self.currency = currency or None
+
+    def render(self) -> str:
+        return f"{self.ticker} last price: {self.price}" + (f" {self.currency}" if self.currency else "")
+
+
+class StocksTool(TypedTool):
     name = "get_stock_price"
     description = "Get latest stock price for a ticker (uses yfinance by default)."
     input_schema = {"ticker": "e.g., AAPL, TSLA"}
+    cache_ttl = settings.STOCKS_CACHE_TTL_S
+    max_stale = settings.STOCKS_MAX_STALE_S
 
-    async def run(self, **kwargs) -> str:
-        ticker = (kwargs.get("ticker") or "").upper().strip()
+    def normalize(self, kwargs: dict[str, Any]) -> dict[str, Any]:
+        ticker = str(kwargs.get("ticker") or "").strip().lstrip("$").upper()
         if not ticker:
-            return "Please provide a ticker (e.g., AAPL)."
+            raise ToolInputError("Please provide a ticker (e.g., AAPL).")
+        if not TICKER_RE.match(ticker):
+            raise ToolInputError(f"'{ticker}' doesn't look like a ticker symbol.")
+        return {"ticker": ticker}
 
+    async def lookup(self, ticker: str) -> ToolResult:
         if settings.STOCKS_PROVIDER == "alphavantage":
             if not settings.ALPHA_VANTAGE_API_KEY:
-                return "Alpha Vantage API key missing. Set ALPHA_VANTAGE_API_KEY or use yfinance."
-            async with httpx.AsyncClient(timeout=10) as client:
+                return ToolMessage("Alpha Vantage API key missing. Set ALPHA_VANTAGE_API_KEY or use yfinance.")
+            async def _quote(client: httpx.AsyncClient) -> dict:
                 r = await client.get(
                     "https://www.alphavantage.co/query",
                     params={
@@ -27,21 +57,32 @@ class StocksTool:
                     },
                 )
                 r.raise_for_status()
-                data = r.json().get("Global Quote", {})
+                return r.json()
+
+            async with httpx.AsyncClient(timeout=settings.UPSTREAM_MAX_TIMEOUT_S) as client:
+                data = (await upstream_policy("alphavantage").call(lambda: _quote(client))).get("Global Quote", {})
                 price = data.get("05. price")
                 if not price:
-                    return f"No price found for {ticker}."
-                return f"{ticker} last price: {price}"
+                    return ToolMessage(f"No price found for {ticker}.")
+                return StockQuote(ticker, float(price))
         else:
-            # yfinance path
-            t = yf.Ticker(ticker)
-            info = t.fast_info
-            price = getattr(info, "last_price", None) or info.get("lastPrice") or info.get("last_price")
-            if price is None:
-                # fallback to history
-                hist = t.history(period="1d")
-                if hist.empty:
-                    return f"No price found for {ticker}."
-                price = float(hist["Close"].iloc[-1])
-            ccy = info.get("currency", "") if isinstance(info, dict) else getattr(info, "currency", "")
-            return f"{ticker} last price: {price} {ccy}"
\ No newline at end of file
+            # yfinance is blocking; run it in a thread so the event loop stays free.
+            # No hedging: cancelling a thread doesn't stop it, so a duplicate would just hold a second one.
+            loop = asyncio.get_running_loop()
+            return await upstream_policy("yfinance", hedge=False).call(
+                lambda: loop.run_in_executor(_YF_POOL, _yfinance_quote, ticker)
+            )
+
+
+def _yfinance_quote(ticker: str) -> ToolResult:
+    t = yf.Ticker(ticker)
+    info = t.fast_info
+    price = getattr(info, "last_price", None) or info.get("lastPrice") or info.get("last_price")
+    if price is None:
+        # fallback to history
+        hist = t.history(period="1d")
+        if hist.empty:
+            return ToolMessage(f"No price found for {ticker}.")
+        price = float(hist["Close"].iloc[-1])
+    ccy = info.get("currency", "") if isinstance(info, dict) else getattr(info, "currency", "")
+    return StockQuote(ticker, float(price), ccy)
\ No newline at end of file
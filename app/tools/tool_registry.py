@@ -1,5 +1,91 @@
 from __future__ import annotations
-from typing import Protocol, Any
+import json
+from abc import ABC, abstractmethod
+from operator import attrgetter
+from typing import Callable, Protocol, Any, ClassVar
+
+# json.dumps(..., separators=...) builds a new encoder per call; reuse one
+compact_dumps: Callable[[Any], str] = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False).encode
+
+
+class ToolInputError(ValueError):
+    """Input rejected by `normalize()`; the message is shown to the user instead of calling upstream."""
+
+
+def _require_concrete(cls: type, *methods: str) -> None:
+    # ABC alone only fails on instantiation, i.e. at request time; fail at class definition instead
+    missing = [m for m in methods if getattr(getattr(cls, m), "__isabstractmethod__", False)]
+    if missing:
+        raise TypeError(f"{cls.__name__} must implement {', '.join(missing)}()")
+
+
+class ToolResult(ABC):
+    """
+    Typed, slot-based tool result.
+
+    Subclasses declare their fields in `__slots__` and a short `kind` tag. They serialize
+    positionally (`[kind, *fields]`, no keys) so cached entries stay small, and
+    `render()` is the human-readable string view that `Tool.run` returns.
+    """
+
+    __slots__ = ()
+    kind: ClassVar[str] = ""
+    _kinds: ClassVar[dict[str, type[ToolResult]]] = {}
+    _fields: ClassVar[Callable[[Any], tuple]] = staticmethod(lambda obj: ())
+
+    def __init_subclass__(cls, **kw):
+        super().__init_subclass__(**kw)
+        if cls.kind:
+            _require_concrete(cls, "render")
+            ToolResult._kinds[cls.kind] = cls
+        if len(cls.__slots__) == 1:
+            get = attrgetter(cls.__slots__[0])
+            cls._fields = staticmethod(lambda obj: (get(obj),))
+        elif cls.__slots__:
+            cls._fields = staticmethod(attrgetter(*cls.__slots__))
+
+    @abstractmethod
+    def render(self) -> str: ...
+
+    def to_row(self) -> list:
+        return [self.kind, *self._fields(self)]
+
+    @classmethod
+    def from_row(cls, row: list) -> ToolResult:
+        return cls._kinds[row[0]](*row[1:])
+
+    def dumps(self) -> str:
+        return compact_dumps(self.to_row())
+
+    @classmethod
+    def loads(cls, raw: str) -> ToolResult:
+        return cls.from_row(json.loads(raw))
+
+    def as_dict(self) -> dict[str, Any]:
+        return {f: getattr(self, f) for f in self.__slots__}
+
+    def __eq__(self, other: object) -> bool:
+        return type(other) is type(self) and self.to_row() == other.to_row()
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{f}={getattr(self, f)!r}" for f in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+    def __str__(self) -> str:
+        return self.render()
+
+
+class ToolMessage(ToolResult):
+    """Free-text result: validation messages, 'not found', and tools that only return strings."""
+
+    __slots__ = ("text",)
+    kind = "m"
+
+    def __init__(self, text: str):
+        self.text = text
+
+    def render(self) -> str:
+        return self.text
 
 
 class Tool(Protocol):
@@ -11,6 +97,49 @@ class Tool(Protocol):
         ...
 
 
+def normalize_input(tool: Any, kwargs: dict[str, Any]) -> dict[str, Any] | ToolMessage:
+    """Run the tool's `normalize()` (if any); a rejected input comes back as the ToolMessage to show instead."""
+    normalize = getattr(tool, "normalize", None)
+    if normalize is None:
+        return kwargs
+    try:
+        return normalize(kwargs)
+    except ToolInputError as e:
+        return ToolMessage(str(e))
+
+
+class TypedTool(ABC):
+    """
+    Base for tools with structured results:
+    `normalize()` validates/canonicalizes input before any call (so cache keys are canonical),
+    `lookup()` returns a ToolResult, and `run()` keeps the `Tool` str contract via `render()`.
+    """
+
+    name: str
+    description: str
+    input_schema: dict
+
+    def normalize(self, kwargs: dict[str, Any]) -> dict[str, Any]:
+        return {k: v for k, v in kwargs.items() if v not in (None, "")}
+
+    def __init_subclass__(cls, **kw):
+        super().__init_subclass__(**kw)
+        if "name" in cls.__dict__:
+            _require_concrete(cls, "lookup")
+
+    @abstractmethod
+    async def lookup(self, **kwargs) -> ToolResult: ...
+
+    async def call(self, **kwargs) -> ToolResult:
+        kwargs = normalize_input(self, kwargs)
+        if isinstance(kwargs, ToolMessage):
+            return kwargs
+        return await self.lookup(**kwargs)
+
+    async def run(self, **kwargs) -> str:
+        return (await self.call(**kwargs)).render()
+
+
 class ToolRegistry:
     def __init__(self):
         self._tools: dict[str, Tool] = {}
@@ -24,4 +153,4 @@ class ToolRegistry:
     def list_descriptions(self) -> str:
         return "\n".join(
             f"- {t.name}: {t.description} input={t.input_schema}" for t in self._tools.values()
-        )
\ No newline at end of file
+        )
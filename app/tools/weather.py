@@ -1,42 +1,101 @@
+import re
 import httpx
-from typing import Any
+from typing import Any, Optional
 from ..config import settings
+from ..core.batching import MicroBatcher
+from ..core.upstream import upstream_policy
+from .tool_registry import ToolInputError, ToolMessage, ToolResult, TypedTool
 
+GEOCODING_URL = "https://geocoding-api.open-meteo.com/v1/search"
+COORDS_RE = re.compile(r"^(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)$")
 
-class WeatherTool:
+
+def parse_coords(location: str) -> Optional[tuple[float, float]]:
+    m = COORDS_RE.match(location)
+    return (round(float(m.group(1)), 4), round(float(m.group(2)), 4)) if m else None
+
+
+def _coord(x: float) -> str:
+    # fixed 4 decimals, trailing zeros trimmed (`:g` keeps 6 significant digits: -122.4194 -> -122.419)
+    return format(x + 0.0, ".4f").rstrip("0").rstrip(".")  # + 0.0 turns -0.0 into 0.0
+
+
+class WeatherReport(ToolResult):
+    __slots__ = ("location", "temperature_c", "windspeed_kmh")
+    kind = "w"
+
+    def __init__(self, location: str, temperature_c: Optional[float], windspeed_kmh: Optional[float]):
+        self.location = location
+        self.temperature_c = temperature_c
+        self.windspeed_kmh = windspeed_kmh
+
+    def render(self) -> str:
+        return f"Current weather at {self.location}: {self.temperature_c}°C, wind {self.windspeed_kmh} km/h."
+
+
+async def _get_json(client: httpx.AsyncClient, url: str, params: dict[str, Any]) -> dict:
+    resp = await client.get(url, params=params)
+    resp.raise_for_status()
+    return resp.json()
+
+
+class WeatherTool(TypedTool):
     name = "get_weather"
     description = "Get current weather for a location using Open-Meteo (no API key)."
     input_schema = {"location": "city or 'lat,lon'"}
+    cache_ttl = settings.WEATHER_CACHE_TTL_S
+    max_stale = settings.WEATHER_MAX_STALE_S
+
+    def __init__(self, transport: httpx.AsyncBaseTransport | None = None):
+        self.transport = transport  # tests/bench inject a local stub
+        # concurrent lookups for different places share one multi-location forecast request
+        self.batcher: MicroBatcher[tuple[float, float], dict] = MicroBatcher(
+            self._fetch_forecasts,
+            window_s=settings.WEATHER_BATCH_WINDOW_MS / 1000,
+            max_batch=settings.WEATHER_BATCH_MAX,
+        )
 
-    async def run(self, **kwargs) -> str:
-        location = kwargs.get("location")
+    def _client(self) -> httpx.AsyncClient:
+        # httpx timeout is only a hard ceiling; the upstream policy applies the adaptive one
+        return httpx.AsyncClient(timeout=settings.UPSTREAM_MAX_TIMEOUT_S, transport=self.transport)
+
+    async def _fetch_forecasts(self, coords: list[tuple[float, float]]) -> list[dict]:
+        params = {
+            "latitude": ",".join(str(lat) for lat, _ in coords),
+            "longitude": ",".join(str(lon) for _, lon in coords),
+            "current_weather": True,
+        }
+        async with self._client() as client:
+            data = await upstream_policy("open-meteo").call(
+                lambda: _get_json(client, settings.WEATHER_API_BASE, params)
+            )
+        # Open-Meteo returns a bare object for one location and a list (same order) for several
+        return data if isinstance(data, list) else [data]
+
+    def normalize(self, kwargs: dict[str, Any]) -> dict[str, Any]:
+        location = " ".join(str(kwargs.get("location") or "").split())
         if not location:
-            return "Please provide a location."
-
-        # If user passes "lat,lon", use it; otherwise geocode via Open-Meteo Nominatim
-        lat = lon = None
-        if "," in location and all(part.strip().replace(".", "", 1).replace("-", "").isdigit() for part in location.split(",", 1)):
-            lat, lon = [p.strip() for p in location.split(",", 1)]
-        else:
-            async with httpx.AsyncClient(timeout=10) as client:
-                gresp = await client.get(
-                    "https://geocoding-api.open-meteo.com/v1/search", params={"name": location, "count": 1}
+            raise ToolInputError("Please provide a location.")
+        coords = parse_coords(location)
+        if coords is None:
+            return {"location": location.casefold()}  # the geocoder is case-insensitive
+        lat, lon = coords
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            raise ToolInputError(f"Coordinates out of range: '{location}'.")
+        return {"location": f"{_coord(lat)},{_coord(lon)}"}
+
+    async def lookup(self, location: str) -> ToolResult:
+        coords = parse_coords(location)
+        if coords is None:
+            async with self._client() as client:
+                gdata = await upstream_policy("open-meteo-geocoding").call(
+                    lambda: _get_json(client, GEOCODING_URL, {"name": location, "count": 1})
                 )
-                gresp.raise_for_status()
-                gdata = gresp.json()
-                if not gdata.get("results"):
-                    return f"Couldn't geocode '{location}'."
-                lat = gdata["results"][0]["latitude"]
-                lon = gdata["results"][0]["longitude"]
-
-        async with httpx.AsyncClient(timeout=10) as client:
-            resp = await client.get(
-                settings.WEATHER_API_BASE,
-                params={"latitude": lat, "longitude": lon, "current_weather": True},
-            )
-            resp.raise_for_status()
-            data = resp.json()
-        cw = data.get("current_weather", {})
-        temp = cw.get("temperature")
-        wind = cw.get("windspeed")
-        return f"Current weather at {location}: {temp}°C, wind {wind} km/h."
\ No newline at end of file
+            if not gdata.get("results"):
+                return ToolMessage(f"Couldn't geocode '{location}'.")
+            place = gdata["results"][0]
+            coords = (round(float(place["latitude"]), 4), round(float(place["longitude"]), 4))
+            location = place.get("name") or location
+
+        cw = (await self.batcher.submit(coords)).get("current_weather", {})
+        return WeatherReport(location, cw.get("temperature"), cw.get("windspeed"))
@@ -0,0 +1,126 @@
+"""
+Hybrid retrieval (SimpleIndexer) latency and ANN recall at growing history sizes.
+
+Synthetic turns are drawn from a Zipf-distributed vocabulary so BM25 has realistic
+postings. The toy hash embeddings have no cluster structure, which is close to a
+worst case for HNSW recall; real embedding models score noticeably higher. For each size we report build time, p50/p99 single-query latency,
+per-query latency when batching, and vector recall@k of the index in use
+(exact below `ann_threshold`, HNSW above it) against brute force.
+
+Usage:
+  python -m bench.retrieval                       # 1k, 100k and 1M turns (1M: ~3 GB RAM, ~15 min)
+  python -m bench.retrieval --sizes 1000 100000
+"""
+from __future__ import annotations
+import argparse
+import resource
+import time
+
+import faiss
+import numpy as np
+
+from app.core.retrieval import SimpleIndexer
+
+
+def synthetic_turns(n: int, vocab: int = 50_000, seed: int = 0) -> list[str]:
+    rng = np.random.default_rng(seed)
+    lengths = rng.integers(4, 24, size=n)
+    words = rng.zipf(1.3, size=int(lengths.sum())) % vocab
+    out, pos = [], 0
+    for i, ln in enumerate(lengths):
+        role = "user" if i % 2 == 0 else "assistant"
+        out.append(f"{role}: " + " ".join(f"w{w}" for w in words[pos : pos + ln]))
+        pos += ln
+    return out
+
+
+def brute_force(index: faiss.Index, qv: np.ndarray, k: int, chunk: int = 100_000) -> tuple[np.ndarray, np.ndarray]:
+    """Exact top-k (scores, ids) over the index's vectors, a chunk at a time (a full copy at 1M is another 1.5 GB)."""
+    heap = faiss.ResultHeap(len(qv), k, keep_max=True)
+    for lo in range(0, index.ntotal, chunk):
+        block = index.reconstruct_n(lo, min(chunk, index.ntotal - lo))
+        scores, ids = faiss.knn(qv, block, k, metric=faiss.METRIC_INNER_PRODUCT)
+        heap.add_result(scores, ids + lo)
+    heap.finalize()
+    return heap.D, heap.I
+
+
+def run(size: int, queries: int, k: int, ann_threshold: int, ef_sweep: list[int]) -> dict:
+    texts = synthetic_turns(size)
+    ix = SimpleIndexer(ann_threshold=ann_threshold)
+    t0 = time.perf_counter()
+    for i in range(0, size, 10_000):
+        ix.add(texts[i : i + 10_000])
+    ix.wait_for_ann()
+    build_s = time.perf_counter() - t0
+
+    qs = synthetic_turns(queries, seed=1)
+    lat = []
+    for q in qs:
+        t = time.perf_counter()
+        ix.search(q, k=k)
+        lat.append((time.perf_counter() - t) * 1000)
+    lat.sort()
+    t = time.perf_counter()
+    ix.search_batch(qs, k=k)
+    batch_ms = (time.perf_counter() - t) * 1000 / len(qs)
+
+    # vector recall@k of the live index vs brute force over the same vectors
+    qv = np.vstack([ix._embed(q) for q in qs])
+    truth_scores, truth = brute_force(ix.index, qv, k)
+
+    def recall_at_k() -> tuple[float, float, float]:
+        t = time.perf_counter()
+        scores, got = ix.index.search(qv, k)
+        ms = (time.perf_counter() - t) * 1000 / len(qs)
+        recall = float(np.mean([len(set(a) & set(b)) / k for a, b in zip(truth, got)]))
+        # how close the returned neighbours score to the exact ones (1.0 = as similar)
+        ratio = float(np.mean(scores.sum(axis=1) / truth_scores.sum(axis=1)))
+        return recall, ratio, ms
+
+    recall, ratio, _ = recall_at_k()
+    sweep = []
+    if ix.is_ann:
+        for ef in ef_sweep:
+            ix.index.hnsw.efSearch = ef
+            sweep.append((ef, *recall_at_k()))
+
+    return {
+        "size": size,
+        "index": "hnsw" if ix.is_ann else "flat",
+        "build_s": build_s,
+        "p50_ms": lat[len(lat) // 2],
+        "p99_ms": lat[max(0, int(len(lat) * 0.99) - 1)],
+        "batch_ms_per_q": batch_ms,
+        "recall": recall,
+        "score_ratio": ratio,
+        "ef_sweep": sweep,
+        "max_rss_gb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**20,
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--ann-threshold", type=int, default=50_000)
+    ap.add_argument("--ef-sweep", type=int, nargs="*", default=[128, 256, 512, 1024])
+    args = ap.parse_args()
+
+    print(
+        f"{'turns':>9} {'index':>6} {'build s':>8} {'p50 ms':>8} {'p99 ms':>8} {'batch ms/q':>11} "
+        f"{'recall@k':>9} {'score ratio':>11} {'max rss GB':>10}"
+    )
+    for size in args.sizes:
+        r = run(size, args.queries, args.k, args.ann_threshold, args.ef_sweep)
+        print(
+            f"{r['size']:>9} {r['index']:>6} {r['build_s']:>8.1f} {r['p50_ms']:>8.2f} "
+            f"{r['p99_ms']:>8.2f} {r['batch_ms_per_q']:>11.2f} {r['recall']:>9.3f} {r['score_ratio']:>11.4f} {r['max_rss_gb']:>10.2f}"
+        )
+        for ef, rec, ratio, ms in r["ef_sweep"]:
+            print(f"{'':>9} {'':>6} efSearch={ef:<4} vector-only {ms:.2f} ms/q, recall@k {rec:.3f}, score ratio {ratio:.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Multi-process cache: per-worker TTLCache vs one SharedMemoryCache for the host.
+
+N worker processes each serve a Zipf-distributed stream of keys (get, then set on
+miss, like a tool call). We report the aggregate hit rate, mean get latency and
+the expected per-request cost once a miss is charged `--miss-ms` of upstream time.
+
+Usage:
+  python -m bench.shm_cache --workers 4 --ops 200000 --keys 20000
+"""
+from __future__ import annotations
+import argparse
+import multiprocessing as mp
+import os
+import tempfile
+import time
+
+import numpy as np
+
+os.environ.setdefault("OPENAI_API_KEY", "unused-by-bench")  # app.config requires it at import
+
+from app.core.cache import TTLCache  # noqa: E402
+from app.core.shm_cache import SharedMemoryCache  # noqa: E402
+
+
+def worker(mode: str, path: str, ops: int, keys: int, seed: int, out) -> None:
+    cache = TTLCache(300) if mode == "local" else SharedMemoryCache(path)
+    rng = np.random.default_rng(seed)
+    stream = (rng.zipf(1.2, size=ops) % keys).tolist()
+    value = "Current weather at somewhere: 12.3°C, wind 5.4 km/h." * 3
+    hits, get_ns = 0, 0
+    for k in stream:
+        key = f"tool:get_weather:{k}"
+        t = time.perf_counter_ns()
+        v = cache.get(key)
+        get_ns += time.perf_counter_ns() - t
+        if v is None:
+            cache.set(key, value, 300)
+        else:
+            hits += 1
+    out.put((hits, get_ns, ops))
+
+
+def run(mode: str, workers: int, ops: int, keys: int, path: str) -> tuple[float, float]:
+    q: mp.Queue = mp.Queue()
+    procs = [mp.Process(target=worker, args=(mode, path, ops, keys, i, q)) for i in range(workers)]
+    for p in procs:
+        p.start()
+    res = [q.get() for _ in procs]
+    for p in procs:
+        p.join()
+    hits = sum(r[0] for r in res)
+    total = sum(r[2] for r in res)
+    return hits / total, sum(r[1] for r in res) / total / 1000
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--ops", type=int, default=200_000)
+    ap.add_argument("--keys", type=int, default=20_000)
+    ap.add_argument("--miss-ms", type=float, default=50.0)
+    args = ap.parse_args()
+
+    shm_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+    with tempfile.TemporaryDirectory(dir=shm_dir) as tmp:
+        path = os.path.join(tmp, "cache")
+        SharedMemoryCache(path).close()  # create before workers race to
+        print(f"{'backend':<8} {'hit rate':>9} {'get us':>8} {'cost/req ms':>12}")
+        for mode in ("local", "shm"):
+            hit, get_us = run(mode, args.workers, args.ops, args.keys, path)
+            cost = get_us / 1000 + (1 - hit) * args.miss_ms
+            print(f"{mode:<8} {hit:>9.3f} {get_us:>8.2f} {cost:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Tool result encoding: legacy cached strings vs typed slot-based rows.
+
+legacy: `{"t": fetched_at, "v": "<rendered sentence>"}` (what CachedTool stored before)
+typed:  `[fetched_at, kind, *fields]` decoded back to a ToolResult and rendered on read
+
+We report encode/decode cost per entry, bytes per cache entry, and resident
+memory per in-process object (slots vs a plain __dict__ class with the same fields).
+
+Usage:
+  python -m bench.tool_results --n 100000
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import time
+import tracemalloc
+
+os.environ.setdefault("OPENAI_API_KEY", "unused-by-bench")  # app.config requires it at import
+
+from app.tools import StockQuote, ToolResult, WeatherReport  # noqa: E402
+from app.tools.tool_registry import compact_dumps  # noqa: E402
+
+
+class DictReport:
+    def __init__(self, location: str, temperature_c: float, windspeed_kmh: float):
+        self.location = location
+        self.temperature_c = temperature_c
+        self.windspeed_kmh = windspeed_kmh
+
+
+def results(n: int) -> list[ToolResult]:
+    out: list[ToolResult] = []
+    for i in range(n):
+        if i % 2:
+            out.append(WeatherReport(f"City {i % 5000}", round(-10 + i % 400 / 10, 1), round(i % 300 / 10, 1)))
+        else:
+            out.append(StockQuote(f"T{i % 3000}", round(10 + i % 90000 / 100, 2), "USD"))
+    return out
+
+
+def timed(fn, items) -> tuple[float, list]:
+    t = time.perf_counter()
+    out = [fn(x) for x in items]
+    return (time.perf_counter() - t) / len(items) * 1e6, out
+
+
+def footprint(make, n: int) -> float:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    keep = [make(i) for i in range(n)]
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del keep
+    return used / n
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=100_000)
+    args = ap.parse_args()
+    items = results(args.n)
+    now = time.time()
+
+    enc_legacy, legacy = timed(lambda r: json.dumps({"t": now, "v": r.render()}), items)
+    dec_legacy, _ = timed(lambda raw: json.loads(raw)["v"], legacy)
+    enc_typed, typed = timed(lambda r: compact_dumps([round(now, 3), *r.to_row()]), items)
+    dec_typed, _ = timed(lambda raw: ToolResult.from_row(json.loads(raw)[1:]).render(), typed)
+
+    def avg_bytes(rows: list[str]) -> float:
+        return sum(len(r.encode("utf-8")) for r in rows) / len(rows)
+
+    print(f"{'format':<8} {'encode us':>10} {'decode us':>10} {'bytes/entry':>12}")
+    print(f"{'legacy':<8} {enc_legacy:>10.2f} {dec_legacy:>10.2f} {avg_bytes(legacy):>12.1f}")
+    print(f"{'typed':<8} {enc_typed:>10.2f} {dec_typed:>10.2f} {avg_bytes(typed):>12.1f}")
+    print()
+    print(f"{'object':<12} {'bytes/obj':>10}")
+    print(f"{'str':<12} {footprint(lambda i: f'Current weather at City {i}: 12.5°C, wind 5.0 km/h.', args.n):>10.1f}")
+    print(f"{'__dict__':<12} {footprint(lambda i: DictReport(f'City {i}', 12.5 + i, 5.0 + i), args.n):>10.1f}")
+    print(f"{'__slots__':<12} {footprint(lambda i: WeatherReport(f'City {i}', 12.5 + i, 5.0 + i), args.n):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Weather forecast throughput with and without micro-batching, against a local stub.
+
+The stub behaves like a rate-limited Open-Meteo: at most `--upstream-slots`
+requests in flight, each taking `--base-ms` plus `--per-loc-ms` per location.
+`--concurrency` callers issue `--requests` lookups for distinct coordinates
+(cache misses). We sweep the batching window and report lookups/s, upstream
+calls, failed lookups (adaptive timeout / open breaker under overload) and
+caller latency. The real "open-meteo" upstream policy is used, reset per run.
+
+Usage:
+  python -m bench.weather_batching --requests 2000 --concurrency 200 --windows 0 5 10 20
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import os
+import time
+
+import httpx
+import numpy as np
+
+os.environ.setdefault("OPENAI_API_KEY", "unused-by-bench")  # app.config requires it at import
+
+from app.core import upstream  # noqa: E402
+from app.tools import WeatherTool  # noqa: E402
+
+
+def stub(slots: int, base_ms: float, per_loc_ms: float, calls: list[int]) -> httpx.MockTransport:
+    sem = asyncio.Semaphore(slots)
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        lats = request.url.params["latitude"].split(",")
+        calls.append(len(lats))
+        async with sem:
+            await asyncio.sleep((base_ms + per_loc_ms * len(lats)) / 1000)
+        body = [{"current_weather": {"temperature": 12.0, "windspeed": 3.0}} for _ in lats]
+        return httpx.Response(200, json=body if len(body) > 1 else body[0])
+
+    return httpx.MockTransport(handler)
+
+
+async def run(args: argparse.Namespace, window_ms: float) -> tuple[float, int, int, float, float]:
+    upstream._policies.clear()
+    calls: list[int] = []
+    tool = WeatherTool(transport=stub(args.upstream_slots, args.base_ms, args.per_loc_ms, calls))
+    tool.batcher.window_s, tool.batcher.max_batch = window_ms / 1000, args.max_batch
+    locations = [f"{(i % 1800) / 10 - 90:.1f},{i // 1800 % 360 - 180}" for i in range(args.requests)]
+    queue: asyncio.Queue[str] = asyncio.Queue()
+    for loc in locations:
+        queue.put_nowait(loc)
+    lat_ms: list[float] = []
+    errors = 0
+
+    async def caller() -> None:
+        nonlocal errors
+        while not queue.empty():
+            loc = queue.get_nowait()
+            t = time.perf_counter()
+            try:
+                await tool.run(location=loc)
+            except Exception:
+                errors += 1
+            lat_ms.append((time.perf_counter() - t) * 1000)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(caller() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - t0
+    p50, p99 = np.percentile(lat_ms, [50, 99])
+    return (args.requests - errors) / elapsed, len(calls), errors, float(p50), float(p99)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=2000)
+    ap.add_argument("--concurrency", type=int, default=200)
+    ap.add_argument("--windows", type=float, nargs="+", default=[0, 5, 10, 20])
+    ap.add_argument("--max-batch", type=int, default=50)
+    ap.add_argument("--upstream-slots", type=int, default=8)
+    ap.add_argument("--base-ms", type=float, default=40.0)
+    ap.add_argument("--per-loc-ms", type=float, default=0.2)
+    args = ap.parse_args()
+
+    print(f"{'window ms':>9} {'lookups/s':>10} {'upstream':>9} {'failed':>7} {'p50 ms':>8} {'p99 ms':>8}")
+    for w in args.windows:
+        rps, calls, errors, p50, p99 = asyncio.run(run(args, w))
+        print(f"{w:>9g} {rps:>10.0f} {calls:>9} {errors:>7} {p50:>8.1f} {p99:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
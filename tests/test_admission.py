@@ -0,0 +1,83 @@
+import asyncio
+import time
+import pytest
+from fastapi import HTTPException
+from app.api.admission import AdmissionController, RedisTokenBucket, TokenBucket
+
+
+async def hold(ctrl: AdmissionController, user: str, release: asyncio.Event):
+    async with ctrl.admit(user):
+        await release.wait()
+
+
+@pytest.mark.asyncio
+async def test_queue_bound_and_deadline_shed_with_503():
+    ctrl = AdmissionController(max_concurrency=1, max_per_user=10, queue_size=1, queue_timeout_s=0.05)
+    release = asyncio.Event()
+    holder = asyncio.create_task(hold(ctrl, "a", release))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(hold(ctrl, "b", release))
+    await asyncio.sleep(0)
+
+    with pytest.raises(HTTPException) as full:
+        async with ctrl.admit("c"):
+            pass
+    assert full.value.status_code == 503  # queue already holds one waiter
+
+    with pytest.raises(HTTPException) as late:
+        await waiter
+    assert late.value.status_code == 503 and ctrl.stats["shed_deadline"] == 1
+    release.set()
+    await holder
+    assert ctrl.active == 0 and ctrl.waiting == 0
+
+
+@pytest.mark.asyncio
+async def test_per_user_concurrency_and_token_bucket():
+    ctrl = AdmissionController(max_per_user=1, user_rate=1.0, user_burst=2.0)
+    release = asyncio.Event()
+    holder = asyncio.create_task(hold(ctrl, "a", release))
+    await asyncio.sleep(0)
+    with pytest.raises(HTTPException) as busy:
+        async with ctrl.admit("a"):
+            pass
+    assert busy.value.status_code == 429
+    release.set()
+    await holder
+
+    # burst of 2 already spent by the two attempts above
+    with pytest.raises(HTTPException) as limited:
+        async with ctrl.admit("a"):
+            pass
+    assert limited.value.status_code == 429
+    async with ctrl.admit("b"):
+        pass
+
+    bucket = TokenBucket()
+    assert [await bucket.take("k", rate=0.0, burst=2) for _ in range(3)] == [True, True, False]
+
+
+@pytest.mark.asyncio
+async def test_refilled_buckets_are_evicted():
+    bucket = TokenBucket(sweep_every_s=0.0)
+    for i in range(100):  # client rotating user_id
+        assert await bucket.take(f"user:{i}", rate=100.0, burst=2)
+    await asyncio.sleep(0.03)  # each refilled 1 token in 10 ms
+    assert await bucket.take("user:new", rate=100.0, burst=2)
+    assert len(bucket) == 1
+
+
+@pytest.mark.asyncio
+async def test_redis_outage_falls_back_to_local_buckets_for_a_cooldown():
+    buckets = RedisTokenBucket("redis://127.0.0.1:1/0", timeout_s=0.1, retry_after_s=60)
+    calls = []
+    script = buckets._script
+
+    async def failing(**kw):
+        calls.append(kw)
+        return await script(**kw)
+
+    buckets._script = failing
+    start = time.monotonic()
+    assert [await buckets.take("u", rate=1, burst=2) for _ in range(3)] == [True, True, False]
+    assert len(calls) == 1 and time.monotonic() - start < 1.0
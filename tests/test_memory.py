@@ -0,0 +1,84 @@
+import gzip
+import json
+import sqlite3
+import pytest
+from sqlalchemy import text
+from app.core.memory import AsyncMemoryStore, MemoryStore
+from app.core.maintenance import MemoryCompactor
+
+
+def test_compaction_collapses_kv_and_archives_old_messages(tmp_path):
+    mem = MemoryStore(f"sqlite:///{tmp_path / 'memory.db'}")
+    for city in ["Paris", "Berlin", "London"]:
+        mem.set_kv("u1", "get_weather", "location", city)
+    mem.set_kv("u2", "meta", "last_tool", "get_weather")
+    for i in range(5):
+        mem.add("u1", "user", f"q{i}")
+    with mem.engine.begin() as conn:
+        conn.execute(text("UPDATE messages SET ts = datetime('now', '-200 days') WHERE content = 'q0'"))
+
+    report = MemoryCompactor(
+        mem, retention_days=90, max_per_user=3, archive_dir=str(tmp_path / "archive")
+    ).run_once()
+
+    assert report.kv_rows_removed == 2
+    assert mem.get_kv("u1", "get_weather", "location") == "London"
+    assert mem.get_kv("u2", "meta", "last_tool") == "get_weather"
+    # q0 is past the window, q1 falls outside the 3-message cap
+    assert report.messages_archived == 2
+    assert [c for _, c in mem.last_k("u1", k=10)] == ["q2", "q3", "q4"]
+    with gzip.open(report.archive_path, "rt", encoding="utf-8") as f:
+        archived = [json.loads(line)["content"] for line in f]
+    assert sorted(archived) == ["q0", "q1"]
+
+
+
+def test_expiry_pages_per_user_in_small_batches(tmp_path):
+    mem = MemoryStore(f"sqlite:///{tmp_path / 'memory.db'}")
+    for i in range(7):
+        mem.add("u1", "user", f"a{i}")
+    for i in range(3):
+        mem.add("u2", "user", f"b{i}")
+    report = MemoryCompactor(mem, max_per_user=2, retention_days_by_user={"u2": 30}, batch_size=2).run_once()
+    assert report.by_user == {"u1": 5, "u2": 1}
+    assert {c for _, c in mem.last_k("u1", k=10)} == {"a5", "a6"}  # same-second rows: newest rowids kept
+    assert {c for _, c in mem.last_k("u2", k=10)} == {"b1", "b2"}
+
+def test_kv_collapse_across_rowid_batches(tmp_path):
+    mem = MemoryStore(f"sqlite:///{tmp_path / 'memory.db'}")
+    for i in range(5):
+        mem.set_kv("u1", "get_weather", "location", f"city{i}")
+        mem.set_kv("u2", "get_weather", "location", f"town{i}")
+    mem.set_kv("u3", "meta", "last_tool", "get_weather")
+    assert mem.compact_kv(batch_size=3) == 8
+    assert mem.get_kv("u1", "get_weather", "location") == "city4"
+    assert mem.get_kv("u2", "get_weather", "location") == "town4"
+    assert mem.get_kv("u3", "meta", "last_tool") == "get_weather"
+
+
+def test_background_pass_is_exclusive_and_never_converts(tmp_path):
+    path = tmp_path / "memory.db"
+    with sqlite3.connect(path) as legacy:  # pre-incremental database: auto_vacuum=0
+        legacy.execute("CREATE TABLE legacy (x)")
+    mem = MemoryStore(f"sqlite:///{path}")
+    compactor = MemoryCompactor(mem, retention_days=90)
+    assert compactor.run_locked() is None and not mem.incremental_vacuum_enabled()
+    compactor.run_once()  # what `app.cli compact` does
+    assert mem.incremental_vacuum_enabled()
+    with compactor.exclusive() as owner:
+        assert owner and MemoryCompactor(mem).run_locked() is None
+    assert compactor.run_locked() is not None
+
+
+@pytest.mark.asyncio
+async def test_async_store_matches_sync_interface(tmp_path):
+    mem = AsyncMemoryStore(f"sqlite:///{tmp_path / 'memory.db'}")
+    await mem.add("u1", "user", "hi")
+    await mem.add("u1", "assistant", "hello")
+    await mem.set_kv("u1", "get_weather", "location", "Paris")
+    await mem.set_kv("u1", "get_weather", "location", "Berlin")
+    assert await mem.last_k("u1") == [("user", "hi"), ("assistant", "hello")]
+    assert await mem.get_kv("u1", "get_weather", "location") == "Berlin"
+    assert await mem.get_kv("u1", "get_weather", "missing") is None
+    await mem.close()
+    assert MemoryStore(f"sqlite:///{tmp_path / 'memory.db'}").incremental_vacuum_enabled()
@@ -0,0 +1,45 @@
+import asyncio
+import time
+import pytest
+from app.api.admission import LoopLagMonitor
+from app.core.profiling import LoopWatchdog, RequestProfiler
+
+
+def busy_json_parse(seconds: float) -> None:
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def blocking_faiss_search() -> None:
+    time.sleep(0.3)
+
+
+def test_armed_capture_folds_hot_path():
+    profiler = RequestProfiler(interval_s=0.002)
+    profiler.arm(2)
+    for _ in range(2):
+        profiler.request_started()
+        busy_json_parse(0.1)
+        profiler.request_finished()
+    assert not profiler.armed and not profiler.status()["sampling"]
+    lines = profiler.last["folded"].splitlines()
+    assert lines and all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    assert any(line.startswith("MainThread;") and "busy_json_parse " in line for line in lines)
+
+
+@pytest.mark.asyncio
+async def test_watchdog_names_blocking_call():
+    monitor = LoopLagMonitor(interval_s=0.02)
+    watchdog = LoopWatchdog(lambda: monitor.beat, threshold_s=0.1, interval_s=0.02)
+    task = asyncio.create_task(monitor.run())
+    watchdog.start()
+    await asyncio.sleep(0.05)
+    blocking_faiss_search()
+    await asyncio.sleep(0.05)
+    watchdog.stop()
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    assert watchdog.stalls == 1
+    assert "blocking_faiss_search" in watchdog.last_stall["stack"]
+    assert monitor.lag_ms > 100  # same heartbeat, same stall
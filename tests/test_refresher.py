@@ -0,0 +1,64 @@
+import asyncio
+import pytest
+from app.tools import ToolRefresher
+
+
+class FakeTool:
+    name = "fake"
+    description = "counts upstream calls"
+    input_schema = {"city": "city name"}
+    cache_ttl = 0.2
+    max_stale = 5
+
+    def __init__(self):
+        self.calls = 0
+
+    async def run(self, **kwargs) -> str:
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return f"{kwargs['city']}#{self.calls}"
+
+
+@pytest.mark.asyncio
+async def test_serves_stale_then_revalidates():
+    refresher = ToolRefresher()
+    upstream = FakeTool()
+    tool = refresher.wrap(upstream)
+
+    first = await asyncio.gather(*(tool.run(city="Oslo") for _ in range(5)))
+    assert first == ["Oslo#1"] * 5 and upstream.calls == 1  # concurrent misses coalesce
+    assert await tool.run(city=" oslo ") == "Oslo#1"       # canonical key
+
+    await asyncio.sleep(0.25)
+    assert await tool.run(city="Oslo") == "Oslo#1"  # stale value served immediately
+    await asyncio.sleep(0.05)
+    assert upstream.calls == 2
+    assert await tool.run(city="Oslo") == "Oslo#2"
+
+
+@pytest.mark.asyncio
+async def test_prefetches_hot_keys_before_expiry():
+    refresher = ToolRefresher(top_n=1, refresh_ahead=0.5)
+    upstream = FakeTool()
+    tool = refresher.wrap(upstream)
+    for _ in range(3):
+        await tool.run(city="Lima")
+    await tool.run(city="Quito")
+
+    await asyncio.sleep(0.12)
+    assert await refresher.refresh_once() == 1  # only the hottest key
+    assert upstream.calls == 3
+    assert await tool.run(city="Lima") == "Lima#3"
+
+
+@pytest.mark.asyncio
+async def test_cache_outage_reads_as_miss(monkeypatch):
+    import redis.asyncio as aioredis
+    from app.core import cache
+
+    unreachable = aioredis.Redis(host="127.0.0.1", port=1, socket_timeout=0.1, socket_connect_timeout=0.1)
+    monkeypatch.setattr(cache, "_aredis", unreachable)
+    upstream = FakeTool()
+    tool = ToolRefresher().wrap(upstream)
+    assert await tool.run(city="Bergen") == "Bergen#1"
+    assert await tool.run(city="Bergen") == "Bergen#2"  # nothing cached, still served
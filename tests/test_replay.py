@@ -0,0 +1,45 @@
+import io
+import json
+import pytest
+from app.core.memory import MemoryStore
+from app.core.replay import ReplayConfig, iter_turns, replay
+
+
+def write_recording(path, routes: dict):
+    with open(path, "w", encoding="utf-8") as f:
+        for msg, routing in routes.items():
+            f.write(json.dumps({"message": msg, "routing": routing}) + "\n")
+
+
+@pytest.mark.asyncio
+async def test_replay_diffs_routing_between_recorded_configs(tmp_path):
+    mem = MemoryStore(f"sqlite:///{tmp_path / 'memory.db'}")
+    for i in range(30):
+        mem.add(f"u{i % 4}", "user", ["weather in Oslo", "price of TSLA", "hi"][i % 3])
+        mem.add(f"u{i % 4}", "assistant", "...")
+    weather = {"type": "tool", "action": "get_weather", "input": {"location": "Oslo"}}
+    stock = {"type": "tool", "action": "get_stock_price", "input": {"ticker": "TSLA"}}
+    write_recording(tmp_path / "a.ndjson", {"weather in Oslo": weather, "price of TSLA": stock})
+    write_recording(tmp_path / "b.ndjson", {"weather in Oslo": weather, "price of TSLA": {"type": "final", "answer": "?"}})
+
+    out = io.StringIO()
+    summary = await replay(
+        iter_turns(str(tmp_path / "memory.db")),
+        ReplayConfig("a", recording=str(tmp_path / "a.ndjson")),
+        ReplayConfig("b", recording=str(tmp_path / "b.ndjson")),
+        concurrency=4,
+        out=out,
+    )
+    assert summary.turns == 30 and summary.changed == 10
+    assert summary.transitions == {"get_stock_price->none": 10}
+    assert summary.errors == {"a": 10, "b": 10}  # "hi" is in neither recording
+    assert summary.latency_ms["a"]["tool"]["n"] == 20
+    diffs = [json.loads(line) for line in out.getvalue().splitlines()]
+    changed = [d for d in diffs if d["message"] == "price of TSLA"]
+    assert len(changed) == 10 and len(diffs) == 20
+    assert all(d["a"]["error"].startswith("RecordingMiss") for d in diffs if d["message"] == "hi")
+
+
+def test_db_source_must_be_sqlite():
+    with pytest.raises(ValueError, match="SQLite"):
+        next(iter_turns("postgresql://user@localhost/db"))
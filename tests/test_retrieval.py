@@ -0,0 +1,29 @@
+from app.core.retrieval import SimpleIndexer
+
+TURNS = [
+    "user: weather in paris",
+    "assistant: 12C and windy in paris",
+    "user: price of AAPL",
+    "assistant: AAPL last price 180 USD",
+    "user: hello there",
+    "user: tell me about rome",
+]
+
+
+def test_keyword_hits_survive_ann_switch_and_small_k():
+    ix = SimpleIndexer(ann_threshold=4, alpha=0.2)  # toy embeddings are random; let BM25 decide
+    ix.add(TURNS[:5])
+    assert not ix.is_ann  # HNSW builds off the caller's thread; flat keeps serving
+    ix.add(TURNS[5:])     # arrives mid-build, caught up on swap
+    assert ix.wait_for_ann() and ix.index.ntotal == len(TURNS)
+    assert set(ix.search("AAPL stock?", k=2)) == {TURNS[2], TURNS[3]}
+    assert len(ix.search("anything", k=50)) == len(TURNS)  # k larger than history
+    assert SimpleIndexer().search("empty index") == []
+
+
+def test_batch_matches_single_and_recency_breaks_ties():
+    ix = SimpleIndexer(alpha=0.0, recency_half_life=2)
+    ix.add(["user: paris trip", "user: rome trip", "user: paris trip"])
+    assert ix.search_batch(["paris", "rome"], k=1) == [ix.search("paris", k=1), ix.search("rome", k=1)]
+    ix.docs[2] = "newest"  # same text twice; the newer copy must win on recency
+    assert ix.search("paris", k=1) == ["newest"]
@@ -0,0 +1,44 @@
+import multiprocessing as mp
+import time
+import pytest
+from app.core.cache import resolve_backend
+from app.core.shm_cache import SharedMemoryCache
+
+
+def _writer(path: str) -> None:
+    SharedMemoryCache(path).set("tool:get_weather:{\"location\":\"oslo\"}", "3°C, wind 12 km/h", ttl=60)
+
+
+def test_visible_across_processes_and_ttl(tmp_path):
+    path = str(tmp_path / "cache")
+    cache = SharedMemoryCache(path, sets=16, ways=4, slot_size=256)
+    p = mp.get_context("fork").Process(target=_writer, args=(path,))
+    p.start()
+    p.join()
+    assert cache.get("tool:get_weather:{\"location\":\"oslo\"}") == "3°C, wind 12 km/h"
+
+    cache.set("short", "lived", ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get("short") is None
+    assert not cache.set("big", "x" * 300)  # larger than a slot
+
+
+def test_eviction_stays_within_set(tmp_path):
+    cache = SharedMemoryCache(str(tmp_path / "cache"), sets=1, ways=4, slot_size=128)
+    for i in range(4):
+        cache.set(f"k{i}", str(i), ttl=100 + i)
+    cache.set("k4", "4", ttl=100)  # evicts k0, the entry closest to expiry
+    assert cache.get("k0") is None
+    assert [cache.get(f"k{i}") for i in range(1, 5)] == ["1", "2", "3", "4"]
+    assert cache.stats["evictions"] == 1
+    cache.set("k1", "updated")  # same key overwrites in place
+    assert cache.get("k1") == "updated" and cache.stats["evictions"] == 1
+
+
+def test_cache_backend_misconfiguration_is_rejected():
+    assert resolve_backend("auto", None) == "local"
+    assert resolve_backend("shm", None) == "shm"
+    with pytest.raises(ValueError, match="REDIS_URL"):
+        resolve_backend("redis", None)
+    with pytest.raises(ValueError, match="'reddis'"):
+        resolve_backend("reddis", "redis://localhost:6379/0")
@@ -0,0 +1,72 @@
+import asyncio
+import pytest
+from sqlalchemy import text
+from app.core.context import ContextManager
+from app.core.maintenance import MemoryCompactor
+from app.core.memory import MemoryStore
+from app.core.summary import ConversationSummarizer
+
+
+@pytest.mark.asyncio
+async def test_turns_are_batched_into_one_bounded_summary(tmp_path):
+    calls = []
+
+    async def fake_summarize(previous, turns, max_chars):
+        calls.append(len(turns))
+        await asyncio.sleep(0.02)
+        return (previous + " | " + ";".join(c for _, c in turns)).strip(" |")[-max_chars:], 1.0
+
+    mem = MemoryStore(f"sqlite:///{tmp_path / 'memory.db'}")
+    summ = ConversationSummarizer(mem, max_chars=40, summarize=fake_summarize)
+    summ.schedule("u1", "q1", "a1")
+    await asyncio.sleep(0)
+    summ.schedule("u1", "q2", "a2")  # arrives while the first fold is running
+    summ.schedule("u1", "q3", "a3")
+    await summ.aclose()
+
+    assert calls == [2, 4]
+    summary, turns = mem.get_summary("u1")
+    assert turns == 3 and len(summary) <= 40 and summary.endswith("q3;a3")
+    assert await ContextManager(mem).conversation_summary("nobody") is None
+
+
+@pytest.mark.asyncio
+async def test_turn_scheduled_as_worker_exits_is_not_stranded():
+    class Store:
+        def __init__(self):
+            self.rows = {}
+
+        async def get_summary(self, user_id):
+            return self.rows.get(user_id)
+
+        async def set_summary(self, user_id, summary, turns):
+            self.rows[user_id] = (summary, turns)
+            if turns == 1:  # runs after the drain loop sees nothing pending, before the task is done
+                asyncio.get_running_loop().call_soon(summ.schedule, user_id, "q2", "a2")
+
+    async def fake_summarize(previous, turns, max_chars):
+        return (previous + ";" + ";".join(c for _, c in turns)).strip(";"), 1.0
+
+    store = Store()
+    summ = ConversationSummarizer(store, summarize=fake_summarize)
+    summ.schedule("u1", "q1", "a1")
+    await asyncio.sleep(0.01)
+    await summ.aclose()
+    assert store.rows["u1"] == ("q1;a1;q2;a2", 2)
+    assert not summ._pending and not summ._workers
+
+
+def test_summaries_expire_with_the_age_window_not_the_cap(tmp_path):
+    mem = MemoryStore(f"sqlite:///{tmp_path / 'memory.db'}")
+    for u in ("u1", "u2"):
+        mem.add(u, "user", "q")
+        mem.set_summary(u, f"{u} asked q", 1)
+    mem.add("u1", "user", "q2")
+    with mem.engine.begin() as conn:
+        conn.execute(text("UPDATE summaries SET ts = datetime('now', '-200 days') WHERE user_id = 'u2'"))
+        conn.execute(text("UPDATE messages SET ts = datetime('now', '-200 days') WHERE user_id = 'u2'"))
+    report = MemoryCompactor(mem, retention_days=90, max_per_user=1).run_once()
+    assert report.by_user == {"u1": 1, "u2": 1}
+    assert report.summaries_removed == 1
+    assert mem.get_summary("u1") == ("u1 asked q", 1)  # only trimmed by the cap
+    assert mem.get_summary("u2") is None  # idle past the window with its transcript
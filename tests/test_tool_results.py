@@ -0,0 +1,54 @@
+import json
+import time
+import httpx
+import pytest
+from app.core.cache import cache_get, cache_set
+from app.tools import StockQuote, StocksTool, ToolRefresher, ToolResult, TypedTool, WeatherReport, WeatherTool
+from app.tools.refresher import cache_key
+
+
+def test_compact_rows_round_trip_and_render():
+    report = WeatherReport("Paris", 12.5, 5.0)
+    assert report.dumps() == '["w","Paris",12.5,5.0]'
+    assert ToolResult.loads(report.dumps()) == report
+    assert report.render() == "Current weather at Paris: 12.5°C, wind 5.0 km/h."
+    assert StockQuote("AAPL", 180.1, "USD").render() == "AAPL last price: 180.1 USD"
+    assert not hasattr(report, "__dict__")
+
+
+def test_missing_render_or_lookup_fails_at_definition():
+    with pytest.raises(TypeError, match="render"):
+        class NoRender(ToolResult):
+            __slots__ = ("x",)
+            kind = "test-no-render"
+    with pytest.raises(TypeError, match="lookup"):
+        class NoLookup(TypedTool):
+            name = "no_lookup"
+
+
+@pytest.mark.asyncio
+async def test_inputs_normalized_before_keying_and_rows_cached():
+    calls = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return httpx.Response(200, json={"current_weather": {"temperature": 3.0, "windspeed": 12.0}})
+
+    tool = ToolRefresher().wrap(WeatherTool(transport=httpx.MockTransport(handler)))
+    assert await tool.run(location="59.9100, 10.75") == "Current weather at 59.91,10.75: 3.0°C, wind 12.0 km/h."
+    assert await tool.run(location=" 59.91 ,10.750000 ") == await tool.run(location="59.91,10.75")
+    assert len(calls) == 1
+
+    raw = cache_get(cache_key("get_weather", {"location": "59.91,10.75"}))
+    assert json.loads(raw)[1:] == ["w", "59.91,10.75", 3.0, 12.0]
+    assert (await tool.run(location="95,10")).startswith("Coordinates out of range")
+    assert WeatherTool().normalize({"location": "37.77493, -122.41942"}) == {"location": "37.7749,-122.4194"}
+    assert WeatherTool().normalize({"location": "-0.00001,100"}) == {"location": "0,100"}
+    assert (await StocksTool().call(ticker="not a ticker")).render() == "'NOT A TICKER' doesn't look like a ticker symbol."
+
+
+@pytest.mark.asyncio
+async def test_legacy_string_entries_still_served():
+    tool = ToolRefresher().wrap(StocksTool())
+    cache_set(cache_key("get_stock_price", {"ticker": "MSFT"}), json.dumps({"t": time.time(), "v": "MSFT last price: 1"}))
+    assert await tool.run(ticker="$msft") == "MSFT last price: 1"
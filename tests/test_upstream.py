@@ -0,0 +1,109 @@
+import asyncio
+import httpx
+import pytest
+from app.core.upstream import CircuitBreaker, CircuitOpenError, UpstreamPolicy
+
+
+def stub_client(delays: list[float], status: int = 200) -> httpx.AsyncClient:
+    """Local stub upstream: the i-th request sleeps delays[i] (last value repeats)."""
+    seen = {"n": 0}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        i = seen["n"]
+        seen["n"] += 1
+        await asyncio.sleep(delays[min(i, len(delays) - 1)])
+        return httpx.Response(status, json={"attempt": i})
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="http://stub")
+
+
+async def get_json(client: httpx.AsyncClient) -> dict:
+    r = await client.get("/q")
+    r.raise_for_status()
+    return r.json()
+
+
+def warmed(policy: UpstreamPolicy, seconds: float, n: int = 20) -> UpstreamPolicy:
+    policy._latencies.extend([seconds] * n)
+    return policy
+
+
+@pytest.mark.asyncio
+async def test_hedge_fires_after_p95_and_wins():
+    policy = warmed(UpstreamPolicy("stub", min_timeout_s=0.5), 0.02)
+    async with stub_client([1.0, 0.01]) as client:
+        data = await policy.call(lambda: get_json(client))
+    assert data == {"attempt": 1}
+    assert policy.metrics["hedges_fired"] == 1 and policy.metrics["hedges_won"] == 1
+
+
+@pytest.mark.asyncio
+async def test_adaptive_timeout_then_breaker_fails_fast():
+    policy = warmed(
+        UpstreamPolicy("stub", min_timeout_s=0.05, hedge=False, breaker=CircuitBreaker(2, reset_after_s=60)),
+        0.01,
+    )
+    assert policy.timeout() == pytest.approx(0.05)
+    async with stub_client([1.0]) as client:
+        for _ in range(2):
+            with pytest.raises(asyncio.TimeoutError):
+                await policy.call(lambda: get_json(client))
+        with pytest.raises(CircuitOpenError):
+            await policy.call(lambda: get_json(client))
+    assert policy.metrics["timeouts"] == 2 and policy.metrics["rejected"] == 1
+    assert policy.breaker.state == "open"
+
+
+@pytest.mark.asyncio
+async def test_client_errors_do_not_trip_breaker():
+    policy = UpstreamPolicy("stub", breaker=CircuitBreaker(1))
+    async with stub_client([0.0], status=404) as client:
+        with pytest.raises(httpx.HTTPStatusError):
+            await policy.call(lambda: get_json(client))
+    assert policy.breaker.state == "closed"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("status,requests", [(400, 1), (429, 1), (503, 2)])
+async def test_fast_failure_hedges_only_when_a_retry_can_help(status, requests):
+    policy = warmed(UpstreamPolicy("stub", breaker=CircuitBreaker(10)), 0.05)
+    sent = []
+    async with stub_client([0.0], status=status) as client:
+        with pytest.raises(httpx.HTTPStatusError):
+            await policy.call(lambda: sent.append(1) or get_json(client))
+    assert len(sent) == requests and policy.metrics["hedges_fired"] == requests - 1
+
+
+@pytest.mark.asyncio
+async def test_timeout_widens_when_upstream_slows_down():
+    policy = warmed(UpstreamPolicy("stub", min_timeout_s=0.05, hedge=False), 0.01)
+    async with stub_client([0.08]) as client:
+        for _ in range(10):
+            try:
+                await policy.call(lambda: get_json(client))
+            except asyncio.TimeoutError:
+                pass
+    assert policy.metrics["timeouts"] == 1 and policy.metrics["successes"] == 9
+    assert policy.timeout() > 0.08
+
+
+@pytest.mark.asyncio
+async def test_half_open_probe_gets_max_timeout():
+    breaker = CircuitBreaker(1, reset_after_s=0.0)
+    policy = warmed(UpstreamPolicy("stub", min_timeout_s=0.05, max_timeout_s=1.0, hedge=False, breaker=breaker), 0.01)
+    breaker.record_failure()
+    async with stub_client([0.2]) as client:
+        assert await policy.call(lambda: get_json(client)) == {"attempt": 0}
+    assert breaker.state == "closed"
+
+
+@pytest.mark.asyncio
+async def test_cancelled_probe_releases_half_open_breaker():
+    breaker = CircuitBreaker(1, reset_after_s=0.0)
+    policy = UpstreamPolicy("stub", hedge=False, breaker=breaker)
+    breaker.record_failure()
+    async with stub_client([1.0, 0.0]) as client:
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(policy.call(lambda: get_json(client)), timeout=0.05)
+        assert await policy.call(lambda: get_json(client)) == {"attempt": 1}
+    assert breaker.state == "closed"
@@ -0,0 +1,42 @@
+import asyncio
+import httpx
+import pytest
+from app.core.batching import MicroBatcher
+from app.tools import WeatherTool
+
+
+def forecast_stub(calls: list[httpx.Request], status: int = 200) -> httpx.MockTransport:
+    """Local Open-Meteo stub: temperature echoes latitude, object for one location, list for several."""
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        lats = request.url.params["latitude"].split(",")
+        body = [{"current_weather": {"temperature": float(lat), "windspeed": 1.0}} for lat in lats]
+        return httpx.Response(status, json=body if len(body) > 1 else body[0])
+
+    return httpx.MockTransport(handler)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_lookups_share_one_request():
+    calls: list[httpx.Request] = []
+    tool = WeatherTool(transport=forecast_stub(calls))
+    tool.batcher.window_s, tool.batcher.max_batch = 0.02, 3
+    locations = ["10,1", "20,2", "30,3", "10.00001,1", "40,4"]
+
+    out = await asyncio.gather(*(tool.run(location=loc) for loc in locations))
+    assert [o.split(": ")[1].split("°")[0] for o in out] == ["10.0", "20.0", "30.0", "10.0", "40.0"]
+    # 4 distinct coordinates, max_batch=3: one full batch flushed early, the rest on the window
+    assert len(calls) == 2 and tool.batcher.stats["max_batch"] == 3
+    assert calls[0].url.params["latitude"] == "10.0,20.0,30.0"
+
+
+@pytest.mark.asyncio
+async def test_batch_failure_reaches_every_caller():
+    async def fetch(keys):
+        raise RuntimeError("upstream down")
+
+    batcher = MicroBatcher(fetch, window_s=0.01, max_batch=10)
+    results = await asyncio.gather(batcher.submit(1), batcher.submit(2), return_exceptions=True)
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert batcher.stats["batches"] == 1